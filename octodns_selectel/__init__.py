@@ -1,8 +1,32 @@
-from .v1.provider import SelectelProvider as SelectelProviderLegacy
-from .v2.provider import SelectelProvider as SelectelProvider
+from importlib import import_module
+
 from .version import __VERSION__, __version__
 
-__all__ = [SelectelProviderLegacy, SelectelProvider]
+# The providers pull in requests and the octodns record machinery, they are
+# imported on first access only, e.g. when octodns loads one from a config.
+_LAZY = {
+    'SelectelProvider': ('.v2.provider', 'SelectelProvider'),
+    'SelectelProviderLegacy': ('.v1.provider', 'SelectelProvider'),
+}
+
+__all__ = ['SelectelProviderLegacy', 'SelectelProvider']
+
+
+def __getattr__(name):
+    try:
+        module, attr = _LAZY[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}'
+        ) from None
+    value = getattr(import_module(module, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
 
 # quell warnings
 __VERSION__
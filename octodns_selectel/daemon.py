@@ -0,0 +1,99 @@
+'''
+Keeps octodns syncing in one long-running process.
+
+Usage: octodns-selectel-daemon --config-file FILE [--interval SECONDS] [--doit]
+
+The providers and their HTTP connections live across cycles. Selectel
+targets configured with in_memory_snapshots (or snapshot_file) remember the
+state of every zone found in sync, so a cycle only downloads and plans zones
+whose desired records changed or whose SOA serial moved. Changing the config
+file starts over with fresh providers.
+'''
+
+from argparse import ArgumentParser
+from io import StringIO
+from logging import INFO, basicConfig, getLogger
+from os.path import getmtime
+from time import monotonic, sleep
+
+from octodns.manager import Manager
+
+from .metrics import Metrics
+from .v2.provider import SelectelProvider
+
+
+class Daemon:
+    def __init__(
+        self,
+        config_file,
+        interval=60,
+        dry_run=True,
+        manager_factory=Manager,
+        clock=monotonic,
+        sleep=sleep,
+    ):
+        self.log = getLogger('SelectelDaemon')
+        self.config_file = config_file
+        self.interval = interval
+        self.dry_run = dry_run
+        self.metrics = Metrics()
+        self._manager_factory = manager_factory
+        self._clock = clock
+        self._sleep = sleep
+        self._manager = None
+        self._config_mtime = None
+
+    def manager(self):
+        mtime = getmtime(self.config_file)
+        if self._manager is None or mtime != self._config_mtime:
+            self.log.info('manager: loading %s', self.config_file)
+            self._manager = self._manager_factory(self.config_file)
+            self._config_mtime = mtime
+        return self._manager
+
+    def cycle(self):
+        start = self._clock()
+        try:
+            # plans are logged by octodns, the text output is not needed
+            manager = self.manager()
+            changes = manager.sync(
+                dry_run=self.dry_run, plan_output_fh=StringIO()
+            )
+            for provider in manager.providers.values():
+                if isinstance(provider, SelectelProvider):
+                    provider.flush_snapshots()
+        except Exception:
+            self.metrics.add('cycle.errors')
+            self.log.exception('cycle: failed')
+            changes = None
+        duration = self._clock() - start
+        self.metrics.add('cycles')
+        self.metrics.set('cycle.seconds', duration)
+        if changes is not None:
+            self.metrics.set('cycle.changes', changes)
+        self.log.info('cycle: changes=%s, seconds=%.3f', changes, duration)
+        return duration
+
+    def run(self, cycles=None):
+        while cycles is None or self.metrics.get('cycles', 0) < cycles:
+            duration = self.cycle()
+            if cycles is None or self.metrics.get('cycles') < cycles:
+                self._sleep(max(0, self.interval - duration))
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--config-file', required=True)
+    parser.add_argument('--interval', type=float, default=60)
+    parser.add_argument(
+        '--doit', action='store_true', help='apply changes, not only plan'
+    )
+    parser.add_argument(
+        '--cycles', type=int, help='stop after this many cycles'
+    )
+    args = parser.parse_args(argv)
+    basicConfig(level=INFO)
+
+    Daemon(args.config_file, args.interval, dry_run=not args.doit).run(
+        args.cycles
+    )
@@ -0,0 +1,28 @@
+from threading import Lock
+
+
+class Metrics:
+    '''
+    Named values a provider reports about its own work, e.g. the page sizes
+    it settled on. Safe to update from the provider's worker threads.
+    '''
+
+    def __init__(self):
+        self._lock = Lock()
+        self._values = {}
+
+    def set(self, name, value):
+        with self._lock:
+            self._values[name] = value
+
+    def add(self, name, value=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + value
+
+    def get(self, name, default=None):
+        with self._lock:
+            return self._values.get(name, default)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
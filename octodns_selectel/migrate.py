@@ -0,0 +1,243 @@
+'''
+Moves domains from the legacy Selectel API (v1) to the current one (v2).
+
+Usage: octodns-selectel-migrate [--checkpoint FILE] [--max-workers N] [zone ...]
+
+Tokens are read from SELECTEL_V1_TOKEN and SELECTEL_V2_TOKEN. Without zone
+arguments every domain of the legacy account is migrated.
+'''
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from json import dump, load
+from logging import INFO, basicConfig, getLogger
+from os import environ, replace
+from os.path import exists
+
+from octodns.provider import ProviderException
+from octodns.zone import Zone
+
+from .names import idna_decode
+from .v1.provider import SelectelProvider as SelectelProviderLegacy
+from .v1.provider import require_root_domain
+from .v2.mappings import canonical_record, to_selectel_rrset
+from .v2.provider import SelectelProvider
+
+
+class SelectelMigrationFailed(ProviderException):
+    def __init__(self, zone_name, failures):
+        details = '; '.join(f'{key}: {error}' for key, error in failures)
+        super().__init__(
+            f'Failed to migrate {len(failures)} rrsets of {zone_name}: '
+            f'{details}'
+        )
+        self.failures = failures
+
+
+class Checkpoint:
+    '''
+    Progress of a migration: the rrsets already created per zone and the
+    zones that are completely migrated. With a path the progress is kept in
+    a JSON file so an interrupted migration resumes where it stopped. The
+    file is rewritten once flush_every rrsets were added and whenever a zone
+    finishes, rrsets created since are found in the target zone on resume.
+    '''
+
+    def __init__(self, path=None, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self._zones = {}
+        self._done = set()
+        self._pending = 0
+        if path and exists(path):
+            with open(path) as fh:
+                data = load(fh)
+            self._zones = {
+                zone_name: set(keys)
+                for zone_name, keys in data['zones'].items()
+            }
+            self._done = set(data['done'])
+
+    def is_done(self, zone_name):
+        return zone_name in self._done
+
+    def created(self, zone_name):
+        return self._zones.get(zone_name, set())
+
+    def add(self, zone_name, key):
+        self._zones.setdefault(zone_name, set()).add(key)
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def finish(self, zone_name):
+        self._zones.pop(zone_name, None)
+        self._done.add(zone_name)
+        self._pending += 1
+        self.flush()
+
+    def flush(self):
+        if not self.path or not self._pending:
+            return
+        data = dict(
+            zones={
+                zone_name: sorted(keys)
+                for zone_name, keys in self._zones.items()
+            },
+            done=sorted(self._done),
+        )
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            dump(data, fh)
+        replace(tmp_path, self.path)
+        self._pending = 0
+
+
+class Migration:
+    def __init__(self, source, target, checkpoint=None, max_workers=8):
+        self.log = getLogger('SelectelMigration')
+        self.source = source
+        self.target = target
+        self.checkpoint = checkpoint or Checkpoint()
+        self.max_workers = max_workers
+
+    def _key(self, record):
+        return f'{record.fqdn} {record._type}'
+
+    def _records(self, zone_name, provider):
+        # The root NS of a v2 zone is managed by Selectel, like octodns does
+        # the migration leaves it alone.
+        zone = Zone(zone_name, [])
+        provider.populate(zone, lenient=True)
+        return [
+            record
+            for record in zone.records
+            if record._type in self.target.SUPPORTS
+            and not (record.name == '' and record._type == 'NS')
+        ]
+
+    def run(self, zone_names):
+        '''
+        Migrates the zones one after another and returns the rrsets that
+        differ between both sides, keyed by zone name.
+        '''
+        mismatches = {}
+        for zone_name in zone_names:
+            zone_name = require_root_domain(zone_name)
+            self.migrate_zone(zone_name)
+            diff = self.verify_zone(zone_name)
+            if diff:
+                mismatches[zone_name] = diff
+        return mismatches
+
+    def migrate_zone(self, zone_name):
+        if self.checkpoint.is_done(zone_name):
+            self.log.info('migrate_zone: %s already migrated', zone_name)
+            return
+        created = set(self.checkpoint.created(zone_name))
+        target_name = idna_decode(zone_name)
+        if self.target._is_zone_already_created(target_name):
+            # An rrset the API created while its response got lost is not
+            # in the checkpoint, creating it again would fail with a
+            # conflict on every attempt. The zone itself tells.
+            created.update(
+                self._key(record)
+                for record in self._records(zone_name, self.target)
+            )
+        else:
+            self.target.create_zone(target_name)
+        records = [
+            record
+            for record in self._records(zone_name, self.source)
+            if self._key(record) not in created
+        ]
+        self.log.info(
+            'migrate_zone: %s, %d rrsets to create, %d already created',
+            zone_name,
+            len(records),
+            len(created),
+        )
+        zone_id = self.target._get_zone_id_by_name(target_name)
+        failures = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(
+                        self.target.create_rrset,
+                        zone_id,
+                        to_selectel_rrset(record),
+                    ): self._key(record)
+                    for record in records
+                }
+                # the checkpoint is written from this thread only
+                for future in as_completed(futures):
+                    key = futures[future]
+                    if exception := future.exception():
+                        self.log.warning(
+                            'migrate_zone: failed to create %s in %s. %s',
+                            key,
+                            zone_name,
+                            exception,
+                        )
+                        failures.append((key, exception))
+                    else:
+                        self.checkpoint.add(zone_name, key)
+        finally:
+            # keep the progress of a zone that failed or was interrupted
+            self.checkpoint.flush()
+        if failures:
+            raise SelectelMigrationFailed(zone_name, sorted(failures))
+        self.checkpoint.finish(zone_name)
+
+    def verify_zone(self, zone_name):
+        '''
+        Returns the sorted keys of the rrsets that are missing on either side
+        or have different values.
+        '''
+        source, target = (
+            {
+                self._key(record): canonical_record(record, provider.MIN_TTL)
+                for record in self._records(zone_name, provider)
+            }
+            for provider in (self.source, self.target)
+        )
+        diff = sorted(
+            key
+            for key in source.keys() | target.keys()
+            if source.get(key) != target.get(key)
+        )
+        self.log.info(
+            'verify_zone: %s, %d rrsets, %d differ',
+            zone_name,
+            len(source),
+            len(diff),
+        )
+        return diff
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('zones', nargs='*')
+    parser.add_argument('--checkpoint', help='file to keep progress in')
+    parser.add_argument('--max-workers', type=int, default=8)
+    args = parser.parse_args(argv)
+    basicConfig(level=INFO)
+
+    source = SelectelProviderLegacy(
+        'selectel-legacy',
+        environ['SELECTEL_V1_TOKEN'],
+        max_workers=args.max_workers,
+    )
+    target = SelectelProvider(
+        'selectel', environ['SELECTEL_V2_TOKEN'], max_workers=args.max_workers
+    )
+    migration = Migration(
+        source,
+        target,
+        checkpoint=Checkpoint(args.checkpoint),
+        max_workers=args.max_workers,
+    )
+    mismatches = migration.run(args.zones or source.list_zones())
+    for zone_name, keys in sorted(mismatches.items()):
+        print(f'{zone_name}: {", ".join(keys)}')
+    return 1 if mismatches else 0
@@ -0,0 +1,41 @@
+from functools import lru_cache
+from sys import intern
+
+from octodns import idna
+from octodns.zone import Zone
+
+# Enough for the names of a few large zones, plan and apply see the same
+# names again and a long-running sync sees them every cycle.
+CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def idna_decode(name):
+    '''
+    octodns.idna.idna_decode, memoized and interned. Lowercasing is all it
+    takes for ASCII names without punycode labels.
+    '''
+    lowered = name.lower()
+    if lowered.isascii() and 'xn--' not in lowered:
+        return intern(lowered)
+    return intern(idna.idna_decode(name))
+
+
+@lru_cache(maxsize=256)
+def _zone(zone_name):
+    return Zone(zone_name, [])
+
+
+def hostname_from_fqdn(fqdn, zone_name):
+    '''
+    Zone.hostname_from_fqdn for the IDNA encoded zone_name. The usual ASCII
+    fqdn of a name in the zone is sliced, anything else goes through the
+    regular expressions of the zone.
+    '''
+    if fqdn.isascii():
+        fqdn = fqdn.lower()
+        if fqdn == zone_name:
+            return ''
+        if fqdn.endswith(zone_name) and fqdn[-len(zone_name) - 1] == '.':
+            return intern(fqdn[: -len(zone_name) - 1])
+    return intern(_zone(zone_name).hostname_from_fqdn(fqdn))
@@ -0,0 +1,67 @@
+from threading import Lock
+
+
+class PageSizer:
+    '''
+    Page size of one kind of listing. With minimum below maximum it adapts
+    to the observed page latency: full pages answered well within
+    target_latency double the size, slower pages shrink it proportionally.
+    Bigger pages mean fewer round-trips, the target keeps them from timing
+    out. The current size is reported to metrics as name.
+    '''
+
+    def __init__(
+        self,
+        initial,
+        minimum=None,
+        maximum=None,
+        target_latency=1.0,
+        metrics=None,
+        name='page_size',
+    ):
+        self.minimum = minimum or initial
+        self.maximum = maximum or initial
+        self.target_latency = target_latency
+        self._metrics = metrics
+        self._name = name
+        self._lock = Lock()
+        self._size = None
+        self._set(min(max(initial, self.minimum), self.maximum))
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def adaptive(self):
+        return self.minimum < self.maximum
+
+    def _set(self, size):
+        self._size = size
+        if self._metrics is not None:
+            self._metrics.set(self._name, size)
+
+    def observe(self, items, latency, size=None):
+        '''
+        Reports a page of items answered after latency seconds. size is the
+        page size the page was requested with, when pages are in flight
+        concurrently only the first to report grows the size and a slow one
+        is not undone by its faster siblings.
+        '''
+        if not self.adaptive:
+            return
+        with self._lock:
+            requested = size or self._size
+            if latency > self.target_latency:
+                size = min(
+                    self._size, int(requested * self.target_latency / latency)
+                )
+            elif (
+                requested == self._size
+                and items >= requested
+                and latency < self.target_latency / 2
+            ):
+                size = requested * 2
+            else:
+                return
+            self._set(min(max(size, self.minimum), self.maximum))
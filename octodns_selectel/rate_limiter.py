@@ -0,0 +1,83 @@
+import os
+from json import dumps, loads
+from threading import Lock
+from time import monotonic, sleep, time
+
+from octodns.provider import ProviderException
+
+try:
+    from fcntl import LOCK_EX, flock
+except ImportError:
+    flock = None
+
+
+class RateLimiter:
+    '''
+    Token bucket shared by the threads of one provider: up to burst requests
+    go out at once, after that callers are spaced to rate requests per second.
+    '''
+
+    def __init__(self, rate, burst=None, clock=monotonic, sleep=sleep):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = Lock()
+        self._tokens = self.burst
+        self._last = clock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            # going below zero reserves a slot in the future
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            self._sleep(wait)
+
+
+class SharedRateLimiter(RateLimiter):
+    '''
+    Token bucket shared by every process on the host using the same path.
+    The bucket lives in that file and is updated under an exclusive lock, so
+    parallel sync processes together stay within rate requests per second.
+    The wall clock is used as the file outlives processes and reboots.
+    '''
+
+    def __init__(self, path, rate, burst=None, clock=time, sleep=sleep):
+        if flock is None:
+            raise ProviderException(
+                'A shared rate limit needs fcntl file locks, not available '
+                'on this platform'
+            )
+        super().__init__(rate, burst=burst, clock=clock, sleep=sleep)
+        self.path = path
+
+    def acquire(self):
+        # Each call locks its own file description, which also serializes
+        # the threads of this process.
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            flock(fd, LOCK_EX)
+            now = self._clock()
+            state = os.read(fd, 256)
+            if state:
+                tokens, last = loads(state)
+                # a clock jumping backwards must not drain the bucket
+                elapsed = max(0, now - last)
+                tokens = min(self.burst, tokens + elapsed * self.rate)
+            else:
+                tokens = self.burst
+            tokens -= 1
+            os.lseek(fd, 0, 0)
+            os.ftruncate(fd, 0)
+            os.write(fd, dumps([tokens, now]).encode())
+        finally:
+            # closing the descriptor releases the lock
+            os.close(fd)
+        if tokens < 0:
+            self._sleep(-tokens / self.rate)
@@ -1,18 +1,25 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
+from time import monotonic, perf_counter
 
 from requests import Session
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
 
 from octodns import __version__ as octodns_version
 from octodns.provider import ProviderException
 from octodns.provider.base import BaseProvider
-from octodns.record import Record, Update
+from octodns.record import Create, Record, Update
 
 from octodns_selectel.escaping_semicolon import (
     escape_semicolon,
     unescape_semicolon,
 )
+from octodns_selectel.metrics import Metrics
+from octodns_selectel.names import hostname_from_fqdn
+from octodns_selectel.page_sizer import PageSizer
+from octodns_selectel.rate_limiter import RateLimiter, SharedRateLimiter
 from octodns_selectel.version import __version__ as provider_version
 
 
@@ -29,6 +36,16 @@ class SelectelAuthenticationRequired(ProviderException):
         super().__init__(message)
 
 
+class SelectelCreateRecordsFailed(ProviderException):
+    def __init__(self, zone_name, failures, total):
+        details = '; '.join(f'{value}: {error}' for value, error in failures)
+        super().__init__(
+            f'Failed to create {len(failures)} of {total} records in '
+            f'{zone_name}: {details}'
+        )
+        self.failures = failures
+
+
 class SelectelProvider(BaseProvider):
     SUPPORTS_GEO = False
 
@@ -40,14 +57,79 @@ class SelectelProvider(BaseProvider):
 
     PAGINATION_LIMIT = 50
 
+    # largest page adaptive_page_size may grow to
+    PAGINATION_MAX_LIMIT = 1000
+
+    SINGLE_VALUE_TYPES = ('CNAME', 'ALIAS')
+
+    # ALIAS has no zone-file form, zones using it are created record by record
+    BIND_ZONE_TYPES = SUPPORTS - {'ALIAS'}
+
+    VALUE_FIELDS = (
+        'content',
+        'priority',
+        'weight',
+        'port',
+        'target',
+        'algorithm',
+        'fingerprint_type',
+        'fingerprint',
+    )
+
     API_URL = 'https://api.selectel.ru/domains/v1'
 
-    def __init__(self, id, token, *args, **kwargs):
+    def __init__(
+        self,
+        id,
+        token,
+        page_size=None,
+        max_workers=8,
+        rate_limit=None,
+        rate_limit_file=None,
+        domain_list_ttl=None,
+        adaptive_page_size=False,
+        *args,
+        **kwargs,
+    ):
         self.log = getLogger(f'SelectelProvider[{id}]')
-        self.log.debug('__init__: id=%s', id)
+        self.log.debug(
+            '__init__: id=%s, page_size=%s, max_workers=%d, rate_limit=%s, '
+            'rate_limit_file=%s, domain_list_ttl=%s, adaptive_page_size=%s',
+            id,
+            page_size,
+            max_workers,
+            rate_limit,
+            rate_limit_file,
+            domain_list_ttl,
+            adaptive_page_size,
+        )
         super().__init__(id, *args, **kwargs)
 
+        self.metrics = Metrics()
+        page_size = page_size or self.PAGINATION_LIMIT
+        self._page_sizers = {
+            kind: PageSizer(
+                page_size,
+                minimum=1 if adaptive_page_size else page_size,
+                maximum=(
+                    self.PAGINATION_MAX_LIMIT
+                    if adaptive_page_size
+                    else page_size
+                ),
+                metrics=self.metrics,
+                name=f'{kind}.page_size',
+            )
+            for kind in ('domains', 'records')
+        }
+        self.max_workers = max_workers
+        self.domain_list_ttl = domain_list_ttl
+        self._rate_limiter = None
+        if rate_limit and rate_limit_file:
+            self._rate_limiter = SharedRateLimiter(rate_limit_file, rate_limit)
+        elif rate_limit:
+            self._rate_limiter = RateLimiter(rate_limit)
         self._sess = Session()
+        self._sess.mount('https://', HTTPAdapter(pool_maxsize=max_workers))
         self._sess.headers.update(
             {
                 'X-Token': token,
@@ -56,13 +138,18 @@ class SelectelProvider(BaseProvider):
             }
         )
         self._zone_records = {}
-        self._domain_list = self.domain_list()
+        self._record_index = {}
+        self._domain_list = None
+        self._domain_list_expires = None
+        self._domains()
         self._zones = None
 
     def _request(self, method, path, params=None, data=None):
         self.log.debug('_request: method=%s, path=%s', method, path)
 
         url = f'{self.API_URL}{path}'
+        if self._rate_limiter:
+            self._rate_limiter.acquire()
         resp = self._sess.request(method, url, params=params, json=data)
 
         self.log.debug('_request: status=%s', resp.status_code)
@@ -77,17 +164,44 @@ class SelectelProvider(BaseProvider):
 
     def _get_total_count(self, path):
         url = f'{self.API_URL}{path}'
+        if self._rate_limiter:
+            self._rate_limiter.acquire()
         resp = self._sess.request('HEAD', url)
         return int(resp.headers['X-Total-Count'])
 
+    def _request_page(self, path, sizer, size, offset):
+        start = perf_counter()
+        page = self._request(
+            'GET', path, params={'limit': size, 'offset': offset}
+        )
+        sizer.observe(len(page), perf_counter() - start, size)
+        return page
+
     def _request_with_pagination(self, path, total_count):
+        # X-Total-Count gives every offset upfront, so pages are fetched
+        # concurrently and concatenated in offset order. An adapted page size
+        # applies from the next listing on.
+        sizer = self._page_sizers['domains' if path == '/' else 'records']
+        size = sizer.size
+        offsets = range(0, total_count, size)
+        if len(offsets) <= 1:
+            pages = [
+                self._request_page(path, sizer, size, offset)
+                for offset in offsets
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                pages = list(
+                    executor.map(
+                        lambda offset: self._request_page(
+                            path, sizer, size, offset
+                        ),
+                        offsets,
+                    )
+                )
         result = []
-        for offset in range(0, total_count, self.PAGINATION_LIMIT):
-            result += self._request(
-                'GET',
-                path,
-                params={'limit': self.PAGINATION_LIMIT, 'offset': offset},
-            )
+        for page in pages:
+            result += page
         return result
 
     def _include_change(self, change):
@@ -110,19 +224,142 @@ class SelectelProvider(BaseProvider):
         )
 
         zone_name = desired.name[:-1]
+        if zone_name not in self._domains() and self._import_domain(
+            zone_name, changes
+        ):
+            return
+        # The values to create are collected over all changes and sent
+        # through one pool, a plan of many single-value records is created
+        # concurrently as well. Deletes and in-place updates run first, stale
+        # values of multi-value records are only deleted once the new values
+        # exist.
+        params_list, deferred = [], []
         for change in changes:
             class_name = change.__class__.__name__
-            getattr(self, f'_apply_{class_name}'.lower())(zone_name, change)
+            if class_name == 'Create':
+                params_list.extend(self._params_for_create(change))
+            elif class_name == 'Update':
+                missing, stale = self._apply_update(zone_name, change)
+                params_list.extend(missing)
+                deferred.extend(stale)
+            else:
+                self._apply_delete(zone_name, change)
+        self._create_records(zone_name, params_list)
+        for key, records in deferred:
+            self._delete_records(zone_name, key, records)
+
+    def _import_domain(self, zone_name, changes):
+        if not all(
+            isinstance(change, Create)
+            and change.new._type in self.BIND_ZONE_TYPES
+            for change in changes
+        ):
+            return False
+        lines = [f'$ORIGIN {zone_name}.']
+        for change in changes:
+            lines.extend(self._bind_zone_lines(change.new))
+        self.log.debug(
+            '_import_domain: zone=%s, len(lines)=%d', zone_name, len(lines)
+        )
+        self.create_domain(zone_name, '\n'.join(lines) + '\n')
+        return True
+
+    def _bind_zone_lines(self, record):
+        _type = record._type
+        if _type == 'CNAME':
+            rdatas = [record.value]
+        elif _type == 'TXT':
+            rdatas = record.chunked_values
+        elif _type == 'MX':
+            rdatas = [f'{v.preference} {v.exchange}' for v in record.values]
+        elif _type == 'SRV':
+            rdatas = [
+                f'{v.priority} {v.weight} {v.port} {v.target}'
+                for v in record.values
+            ]
+        elif _type == 'SSHFP':
+            rdatas = [
+                f'{v.algorithm} {v.fingerprint_type} {v.fingerprint}'
+                for v in record.values
+            ]
+        else:
+            rdatas = record.values
+        name = record.name or '@'
+        ttl = max(self.MIN_TTL, record.ttl)
+        return [f'{name} {ttl} IN {_type} {rdata}' for rdata in rdatas]
 
-    def _apply_create(self, zone_name, change):
+    def _params_for_create(self, change):
         new = change.new
         params_for = getattr(self, f'_params_for_{new._type}')
-        for params in params_for(new):
-            self.create_record(zone_name, params)
+        return params_for(new)
+
+    def _create_records(self, zone_name, params_list):
+        if len(params_list) <= 1:
+            for params in params_list:
+                self.create_record(zone_name, params)
+            return
+        # the domain must exist before values are created concurrently
+        if zone_name not in self._domains():
+            self.create_domain(zone_name)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                (params, executor.submit(self.create_record, zone_name, params))
+                for params in params_list
+            ]
+        failures = []
+        for params, future in futures:
+            if exception := future.exception():
+                _type = params['type']
+                value = ' '.join(
+                    str(v) for v in self._value_key(_type, params) if v
+                )
+                self.log.warning(
+                    'Failed to create %s %s value %s. %s',
+                    params['name'],
+                    _type,
+                    value,
+                    exception,
+                )
+                failures.append(
+                    (f'{params["name"]} {_type} {value}', exception)
+                )
+        if failures:
+            raise SelectelCreateRecordsFailed(
+                zone_name, failures, len(params_list)
+            )
 
     def _apply_update(self, zone_name, change):
-        self._apply_delete(zone_name, change)
-        self._apply_create(zone_name, change)
+        # Every value is a separate record in v1, only the values that differ
+        # are touched so unchanged values keep resolving during the update.
+        # Returns the params of the values to create and the stale values to
+        # delete after they were created.
+        new = change.new
+        index = self._records_index(zone_name)
+        key = self._index_key(new.fqdn, new._type)
+        params_for = getattr(self, f'_params_for_{new._type}')
+        missing = {
+            self._value_key(new._type, params): params
+            for params in params_for(new)
+        }
+        kept, stale = [], []
+        for record in index.pop(key, []):
+            params = missing.pop(self._value_key(new._type, record), None)
+            if params is None:
+                stale.append(record)
+            elif record['ttl'] == params['ttl'] or self._update_record(
+                zone_name, record, params
+            ):
+                kept.append(record)
+            else:
+                stale.append(record)
+                missing[self._value_key(new._type, params)] = params
+        index[key] = kept
+
+        if new._type in self.SINGLE_VALUE_TYPES:
+            # a name holds one of them at a time, the old one goes first
+            self._delete_records(zone_name, key, stale)
+            return list(missing.values()), []
+        return list(missing.values()), [(key, stale)]
 
     def _apply_delete(self, zone_name, change):
         existing = change.existing
@@ -131,7 +368,7 @@ class SelectelProvider(BaseProvider):
     def list_zones(self):
         # This method is called dynamically in octodns.Manager._preprocess_zones()
         # and required for use of "*" if provider is source.
-        zones_without_dot = self.domain_list()
+        zones_without_dot = self._domains()
         return [
             require_root_domain(zone_name) for zone_name in zones_without_dot
         ]
@@ -285,7 +522,7 @@ class SelectelProvider(BaseProvider):
         if records:
             values = defaultdict(lambda: defaultdict(list))
             for record in records:
-                name = zone.hostname_from_fqdn(record['name'])
+                name = hostname_from_fqdn(record['name'], zone.name)
                 _type = record['type']
                 if _type in self.SUPPORTS:
                     values[name][record['type']].append(record)
@@ -313,6 +550,19 @@ class SelectelProvider(BaseProvider):
             domains[domain['name']] = domain
         return domains
 
+    def _domains(self):
+        # name -> domain, listed once and then kept current by create_domain.
+        # With domain_list_ttl the listing is repeated once it gets older.
+        now = monotonic()
+        if self._domain_list is None or (
+            self._domain_list_expires is not None
+            and now >= self._domain_list_expires
+        ):
+            self._domain_list = self.domain_list()
+            if self.domain_list_ttl is not None:
+                self._domain_list_expires = now + self.domain_list_ttl
+        return self._domain_list
+
     def zone_records(self, zone):
         path = f'/{zone.name[:-1]}/records/'
         zone_records = []
@@ -321,48 +571,110 @@ class SelectelProvider(BaseProvider):
         zone_records = self._request_with_pagination(path, total_count)
 
         self._zone_records[zone.name] = zone_records
+        self._record_index.pop(zone.name[:-1], None)
         return self._zone_records[zone.name]
 
+    def _index_key(self, name, _type):
+        return (name.rstrip('.'), _type)
+
+    def _value_key(self, _type, record):
+        key = []
+        for field in self.VALUE_FIELDS:
+            value = record.get(field)
+            if isinstance(value, str) and _type != 'TXT':
+                value = value.rstrip('.').lower()
+            key.append(value)
+        return tuple(key)
+
+    def _records_index(self, domain):
+        # (name, type) -> records of the domain, built once from the full
+        # listing and kept current by create_record and delete_record.
+        index = self._record_index.get(domain)
+        if index is None:
+            records = self._zone_records.get(f'{domain}.')
+            if records is None:
+                domain_id = self._domains()[domain]['id']
+                path = f'/{domain_id}/records/'
+                total_count = self._get_total_count(path)
+                records = self._request_with_pagination(path, total_count)
+            index = defaultdict(list)
+            for record in records:
+                index[self._index_key(record['name'], record['type'])].append(
+                    record
+                )
+            self._record_index[domain] = index
+        return index
+
     def create_domain(self, name, zone=""):
         path = '/'
 
         data = {'name': name, 'bind_zone': zone}
 
         resp = self._request('POST', path, data=data)
-        self._domain_list[name] = resp
+        self._domains()[name] = resp
         return resp
 
     def create_record(self, zone_name, data):
         self.log.debug('Create record. Zone: %s, data %s', zone_name, data)
-        if zone_name in self._domain_list.keys():
-            domain_id = self._domain_list[zone_name]['id']
+        domains = self._domains()
+        if zone_name in domains:
+            domain_id = domains[zone_name]['id']
         else:
             domain_id = self.create_domain(zone_name)['id']
 
         path = f'/{domain_id}/records/'
-        return self._request('POST', path, data=data)
-
-    def delete_record(self, domain, _type, zone):
-        self.log.debug('Delete records. Domain: %s, Type: %s', domain, _type)
-        domain_id = self._domain_list[domain]['id']
-        records = self._zone_records.get(f'{domain}.', False)
-        if not records:
-            path = f'/{domain_id}/records/'
-            records = self._request('GET', path)
+        created = self._request('POST', path, data=data)
+        index = self._record_index.get(zone_name)
+        if index is not None and created:
+            key = self._index_key(data['name'], data['type'])
+            # setdefault is atomic, values may be created concurrently
+            index.setdefault(key, []).append(created)
+        return created
+
+    def update_record(self, zone_name, record_id, data):
+        self.log.debug(
+            'Update record. Zone: %s, id: %s, data %s',
+            zone_name,
+            record_id,
+            data,
+        )
+        domain_id = self._domains()[zone_name]['id']
+        path = f'/{domain_id}/records/{record_id}'
+        return self._request('PUT', path, data=data)
+
+    def _update_record(self, zone_name, record, params):
+        try:
+            self.update_record(zone_name, record['id'], params)
+        except HTTPError:
+            self.log.warning(
+                f'Failed to update record {record["id"]}, re-creating it'
+            )
+            return False
+        record['ttl'] = params['ttl']
+        return True
 
-        full_domain = f'{zone}.{domain}' if zone else domain
-        delete_count, skip_count = 0, 0
+    def _delete_records(self, domain, key, records):
+        domain_id = self._domains()[domain]['id']
+        delete_count, skipped = 0, []
         for record in records:
-            if record['type'] == _type and record['name'] == full_domain:
-                record_id = record["id"]
-                path = f'/{domain_id}/records/{record_id}'
-                try:
-                    self._request('DELETE', path)
-                    delete_count += 1
-                except HTTPError:
-                    skip_count += 1
-                    self.log.warning(f'Failed to delete record {record_id}')
+            record_id = record["id"]
+            path = f'/{domain_id}/records/{record_id}'
+            try:
+                self._request('DELETE', path)
+                delete_count += 1
+            except HTTPError:
+                skipped.append(record)
+                self.log.warning(f'Failed to delete record {record_id}')
+        self._records_index(domain)[key].extend(skipped)
 
         self.log.debug(
-            f'Deleted {delete_count} records. Skipped {skip_count} records'
+            f'Deleted {delete_count} records. Skipped {len(skipped)} records'
         )
+
+    def delete_record(self, domain, _type, zone):
+        self.log.debug('Delete records. Domain: %s, Type: %s', domain, _type)
+        index = self._records_index(domain)
+
+        full_domain = f'{zone}.{domain}' if zone else domain
+        key = self._index_key(full_domain, _type)
+        self._delete_records(domain, key, index.pop(key, []))
@@ -0,0 +1,102 @@
+from collections import defaultdict, deque
+from json import dumps, loads
+from threading import Lock
+from time import perf_counter, sleep
+from urllib.parse import parse_qsl, urlsplit
+
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from .exceptions import SelectelException
+
+
+def _interaction_key(method, path, params, body):
+    return dumps([method, path, sorted(params), body], sort_keys=True)
+
+
+def _request_fields(request):
+    url = urlsplit(request.url)
+    body = loads(request.body) if request.body else None
+    return request.method, url.path, parse_qsl(url.query), body
+
+
+class RecordingAdapter(HTTPAdapter):
+    '''
+    Sends requests as usual and appends every interaction (method, path,
+    params, body, status, latency and response) as a JSON line to path.
+    '''
+
+    def __init__(self, path, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = path
+        self._lock = Lock()
+
+    def send(self, request, *args, **kwargs):
+        start = perf_counter()
+        response = super().send(request, *args, **kwargs)
+        latency = perf_counter() - start
+        method, path, params, body = _request_fields(request)
+        line = dumps(
+            dict(
+                method=method,
+                path=path,
+                params=params,
+                body=body,
+                status=response.status_code,
+                latency=latency,
+                response=response.text,
+            )
+        )
+        with self._lock:
+            with open(self.path, 'a') as fh:
+                fh.write(f'{line}\n')
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    '''
+    Serves the responses of a recorded cassette instead of talking to the
+    API. Identical requests get their recorded responses in the recorded
+    order, each after its recorded latency multiplied by latency_scale.
+    '''
+
+    def __init__(self, path, latency_scale=1.0, sleep=sleep):
+        super().__init__()
+        self.latency_scale = latency_scale
+        self._sleep = sleep
+        self._lock = Lock()
+        self._interactions = defaultdict(deque)
+        with open(path) as fh:
+            for line in fh:
+                interaction = loads(line)
+                key = _interaction_key(
+                    interaction['method'],
+                    interaction['path'],
+                    [tuple(param) for param in interaction['params']],
+                    interaction['body'],
+                )
+                self._interactions[key].append(interaction)
+
+    def send(self, request, *args, **kwargs):
+        method, path, params, body = _request_fields(request)
+        with self._lock:
+            recorded = self._interactions.get(
+                _interaction_key(method, path, params, body)
+            )
+            interaction = recorded.popleft() if recorded else None
+        if interaction is None:
+            raise SelectelException(
+                f'No recorded response for {method} {request.url}'
+            )
+        if latency := interaction['latency'] * self.latency_scale:
+            self._sleep(latency)
+        response = Response()
+        response.status_code = interaction['status']
+        response._content = interaction['response'].encode()
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,15 @@
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+
+def filter_rrsets(rrsets, types):
+    '''
+    Drops the rrsets whose type is not in types, called on every page before
+    anything else is built from it.
+    '''
+    return [rrset for rrset in rrsets if rrset['type'] in types]
+
+
+__all__ = ['filter_rrsets', 'loads']
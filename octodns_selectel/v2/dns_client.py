@@ -1,8 +1,12 @@
-from requests import Session
+from time import perf_counter
 
 from octodns import __version__ as octodns_version
 
+from octodns_selectel.page_sizer import PageSizer
+
+from .decoding import filter_rrsets
 from .exceptions import ApiException
+from .transport import RequestsTransport
 
 
 class DNSClient:
@@ -13,15 +17,39 @@ class DNSClient:
     __rrsets_path = "/zones/{}/rrset"
     __rrsets_path_specific = "/zones/{}/rrset/{}"
 
-    def __init__(self, library_version: str, openstack_token: str):
-        self._sess = Session()
-        self._sess.headers.update(
-            {
-                'X-Auth-Token': openstack_token,
-                'Content-Type': 'application/json',
-                'User-Agent': f'octodns/{octodns_version} octodns-selectel/{library_version}',
-            }
-        )
+    def __init__(
+        self,
+        library_version: str,
+        openstack_token: str,
+        max_connections: int = 10,
+        transport=None,
+        page_size=None,
+        adaptive_page_size=False,
+        metrics=None,
+        rate_limiter=None,
+    ):
+        # Any object with the request method of RequestsTransport works as
+        # transport, MemoryTransport for one serves requests in-process.
+        self._transport = transport or RequestsTransport(max_connections)
+        self._rate_limiter = rate_limiter
+        page_size = page_size or self._PAGINATION_LIMIT
+        self._page_sizers = {
+            kind: PageSizer(
+                page_size,
+                minimum=1 if adaptive_page_size else page_size,
+                maximum=(
+                    self._PAGINATION_LIMIT if adaptive_page_size else page_size
+                ),
+                metrics=metrics,
+                name=f'{kind}.page_size',
+            )
+            for kind in ('zones', 'rrsets')
+        }
+        self._headers = {
+            'X-Auth-Token': openstack_token,
+            'Content-Type': 'application/json',
+            'User-Agent': f'octodns/{octodns_version} octodns-selectel/{library_version}',
+        }
 
     @classmethod
     def _rrset_path(cls, zone_id):
@@ -33,45 +61,56 @@ class DNSClient:
 
     def _request(self, method, path, params=None, data=None):
         url = f'{self.API_URL}{path}'
-        resp = self._sess.request(method, url, params, json=data)
-        try:
-            resp_json = resp.json()
-        except ValueError:
-            resp_json = {}
-        if resp.status_code in {200, 201, 204}:
+        if self._rate_limiter:
+            self._rate_limiter.acquire()
+        status_code, resp_json = self._transport.request(
+            method, url, params=params, json=data, headers=self._headers
+        )
+        if status_code in {200, 201, 204}:
             return resp_json
-        elif resp.status_code in {400, 422}:
+        elif status_code in {400, 422}:
             raise ApiException(
                 f'Bad request. Description: {resp_json.get("description", "Invalid payload")}.'
             )
-        elif resp.status_code == 401:
+        elif status_code == 401:
             raise ApiException('Authorization failed. Invalid or empty token.')
-        elif resp.status_code == 404:
+        elif status_code == 404:
             raise ApiException(
                 'Resource not found: '
                 f'{resp_json.get("error", "invalid path")}.'
             )
-        elif resp.status_code == 409:
+        elif status_code == 409:
             raise ApiException(
                 f'Conflict: {resp_json.get("error", "resource maybe already created")}.'
             )
         else:
             raise ApiException('Internal server error.')
 
-    def _request_all_entities(self, path, offset=0):
+    def _iter_pages(self, path, offset=0, **filters):
+        sizer = self._page_sizers[
+            'zones' if path == self._zone_path else 'rrsets'
+        ]
+        while True:
+            start = perf_counter()
+            resp = self._request(
+                "GET",
+                path,
+                dict(
+                    limit=sizer.size,
+                    offset=offset,
+                    sort_by="name.descend",
+                    **filters,
+                ),
+            )
+            sizer.observe(len(resp["result"]), perf_counter() - start)
+            yield resp["result"]
+            if not (offset := resp["next_offset"]):
+                return
+
+    def _request_all_entities(self, path, offset=0, **filters):
         items = []
-        resp = self._request(
-            "GET",
-            path,
-            dict(
-                limit=self._PAGINATION_LIMIT,
-                offset=offset,
-                sort_by="name.descend",
-            ),
-        )
-        items.extend(resp["result"])
-        if next_offset := resp["next_offset"]:
-            items.extend(self._request_all_entities(path, offset=next_offset))
+        for page in self._iter_pages(path, offset, **filters):
+            items.extend(page)
         return items
 
     def list_zones(self):
@@ -80,9 +119,27 @@ class DNSClient:
     def create_zone(self, name):
         return self._request('POST', self._zone_path, data=dict(name=name))
 
-    def list_rrsets(self, zone_id):
-        path = self._rrset_path(zone_id)
-        return self._request_all_entities(path)
+    def list_rrsets(
+        self, zone_id, rrset_types=None, name=None, search=None, keep_types=None
+    ):
+        # rrset_types is a comma separated list of types, name matches the
+        # rrset name exactly and search any part of it
+        filters = dict(rrset_types=rrset_types, name=name, search=search)
+        rrsets = []
+        for page in self.iter_rrset_pages(
+            zone_id,
+            keep_types,
+            **{key: value for key, value in filters.items() if value},
+        ):
+            rrsets.extend(page)
+        return rrsets
+
+    def iter_rrset_pages(self, zone_id, keep_types=None, **filters):
+        # keep_types drops the other rrsets of every page as it arrives
+        pages = self._iter_pages(self._rrset_path(zone_id), **filters)
+        if keep_types is None:
+            return pages
+        return (filter_rrsets(page, keep_types) for page in pages)
 
     def create_rrset(self, zone_id, data):
         path = self._rrset_path(zone_id)
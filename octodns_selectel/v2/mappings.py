@@ -137,3 +137,46 @@ def to_octodns_record_data(rrset):
         )
     octodns_record[key_for_record_values] = record_values
     return octodns_record
+
+
+def canonical_record(record, min_ttl=0):
+    # Values become plain tuples, octodns value objects are not hashable.
+    record_type = record._type
+    if record_type in {"A", "AAAA", "NS"}:
+        values = tuple(sorted(record.values))
+    elif record_type in {"CNAME", "ALIAS", "DNAME"}:
+        values = (record.value,)
+    elif record_type == "TXT":
+        values = tuple(sorted(unescape_semicolon(v) for v in record.values))
+    elif record_type == "CAA":
+        values = tuple(sorted((v.flags, v.tag, v.value) for v in record.values))
+    elif record_type == "MX":
+        values = tuple(
+            sorted((v.preference, v.exchange) for v in record.values)
+        )
+    elif record_type == "SRV":
+        values = tuple(
+            sorted(
+                (v.priority, v.weight, v.port, v.target) for v in record.values
+            )
+        )
+    elif record_type == "SSHFP":
+        values = tuple(
+            sorted(
+                (v.algorithm, v.fingerprint_type, v.fingerprint.lower())
+                for v in record.values
+            )
+        )
+    else:
+        raise SelectelException(
+            f'DNS Record with type: {record_type} not supported'
+        )
+    return (record_type, max(min_ttl, record.ttl), values)
+
+
+def record_fingerprint(record, min_ttl=0):
+    # Comparing fingerprints compares the hashes first, unequal records are
+    # told apart by one integer comparison. Equal hashes are confirmed on the
+    # canonical form, a collision must not hide an update.
+    canonical = canonical_record(record, min_ttl)
+    return hash(canonical), canonical
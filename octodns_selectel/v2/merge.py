@@ -0,0 +1,47 @@
+from itertools import groupby
+
+from .exceptions import SelectelException
+
+
+def _checked_descending(items, key):
+    previous = None
+    for item in items:
+        current = key(item)
+        if previous is not None and current > previous:
+            raise SelectelException(
+                f'Items are not sorted descending: {current} after {previous}'
+            )
+        previous = current
+        yield item
+
+
+def merge_join(existing, desired, key):
+    '''
+    Joins two iterables sorted descending by key and yields
+    (key, existing items, desired items) for every key found on either
+    side. Only the items sharing the current key are held in memory.
+    '''
+    existing = groupby(_checked_descending(existing, key), key)
+    desired = groupby(_checked_descending(desired, key), key)
+    current_existing = next(existing, None)
+    current_desired = next(desired, None)
+    while current_existing is not None or current_desired is not None:
+        if current_desired is None or (
+            current_existing is not None
+            and current_existing[0] > current_desired[0]
+        ):
+            yield current_existing[0], list(current_existing[1]), []
+            current_existing = next(existing, None)
+        elif current_existing is None or (
+            current_desired[0] > current_existing[0]
+        ):
+            yield current_desired[0], [], list(current_desired[1])
+            current_desired = next(desired, None)
+        else:
+            yield (
+                current_existing[0],
+                list(current_existing[1]),
+                list(current_desired[1]),
+            )
+            current_existing = next(existing, None)
+            current_desired = next(desired, None)
@@ -0,0 +1,35 @@
+from queue import Queue
+from threading import Event, Thread
+
+
+def iter_pipelined(pages, depth):
+    '''
+    Iterates over pages while a producer thread keeps fetching the next ones,
+    at most depth fetched pages wait in the queue for the consumer.
+    '''
+    queue = Queue(maxsize=depth)
+    stop = Event()
+
+    def produce():
+        try:
+            for page in pages:
+                if stop.is_set():
+                    return
+                queue.put(page)
+            last = None
+        except Exception as exception:
+            last = exception
+        if not stop.is_set():
+            queue.put(last)
+
+    Thread(target=produce, daemon=True).start()
+    try:
+        while (page := queue.get()) is not None:
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        # unblock a producer waiting on a full queue so it can stop
+        stop.set()
+        while not queue.empty():
+            queue.get_nowait()
@@ -2,17 +2,38 @@
 #
 #
 
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
+from time import perf_counter
 
-from octodns.idna import idna_decode
 from octodns.provider.base import BaseProvider
-from octodns.record import Record, SshfpRecord, Update
+from octodns.record import Create, Delete, Record, Update
+from octodns.zone import Zone
 
+from octodns_selectel.metrics import Metrics
+from octodns_selectel.names import hostname_from_fqdn, idna_decode
+from octodns_selectel.rate_limiter import RateLimiter, SharedRateLimiter
 from octodns_selectel.version import __version__ as provider_version
 
+from .cassette import RecordingAdapter, ReplayAdapter
 from .dns_client import DNSClient
-from .exceptions import ApiException
-from .mappings import to_octodns_record_data, to_selectel_rrset
+from .exceptions import ApiException, SelectelException
+from .mappings import (
+    record_fingerprint,
+    to_octodns_record_data,
+    to_selectel_rrset,
+)
+from .merge import merge_join
+from .pipeline import iter_pipelined
+from .sharding import shard_of
+from .single_flight import SingleFlight
+from .snapshot import ZoneSnapshots, soa_serial, zone_digest
+from .transport import RequestsTransport
+from .validation import (
+    SelectelValidationFailed,
+    cname_conflicts,
+    validate_rrsets,
+)
 
 
 class SelectelProvider(BaseProvider):
@@ -33,28 +54,187 @@ class SelectelProvider(BaseProvider):
         )
     )
     MIN_TTL = 60
+    # the SOA serial tells whether a cached listing is still current
+    _listed_types = SUPPORTS | {'SOA'}
 
-    def __init__(self, id, token, *args, **kwargs):
+    def __init__(
+        self,
+        id,
+        token,
+        snapshot_file=None,
+        in_memory_snapshots=False,
+        prefetch=False,
+        max_workers=8,
+        pipeline_depth=0,
+        record_traffic=None,
+        replay_traffic=None,
+        replay_latency_scale=1.0,
+        transport=None,
+        page_size=None,
+        adaptive_page_size=False,
+        shard_index=0,
+        shard_count=1,
+        rate_limit=None,
+        rate_limit_file=None,
+        *args,
+        **kwargs,
+    ):
         self.log = getLogger(f'SelectelProvider[{id}]')
-        self.log.debug('__init__: id=%s', id)
+        self.log.debug(
+            '__init__: id=%s, snapshot_file=%s, in_memory_snapshots=%s, '
+            'prefetch=%s, max_workers=%d, '
+            'pipeline_depth=%d, record_traffic=%s, replay_traffic=%s, '
+            'replay_latency_scale=%s, page_size=%s, adaptive_page_size=%s, '
+            'shard_index=%d, shard_count=%d, rate_limit=%s, '
+            'rate_limit_file=%s',
+            id,
+            snapshot_file,
+            in_memory_snapshots,
+            prefetch,
+            max_workers,
+            pipeline_depth,
+            record_traffic,
+            replay_traffic,
+            replay_latency_scale,
+            page_size,
+            adaptive_page_size,
+            shard_index,
+            shard_count,
+            rate_limit,
+            rate_limit_file,
+        )
+        if prefetch and not isinstance(prefetch, list):
+            raise SelectelException(
+                'prefetch takes the list of zones to download'
+            )
+        if not 0 <= shard_index < shard_count:
+            raise SelectelException(
+                f'shard_index {shard_index} out of range for '
+                f'shard_count {shard_count}'
+            )
         super().__init__(id, *args, **kwargs)
-        self._client = DNSClient(provider_version, token)
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.metrics = Metrics()
+        rate_limiter = None
+        if rate_limit and rate_limit_file:
+            rate_limiter = SharedRateLimiter(rate_limit_file, rate_limit)
+        elif rate_limit:
+            rate_limiter = RateLimiter(rate_limit)
+        if replay_traffic:
+            transport = RequestsTransport(
+                adapter=ReplayAdapter(
+                    replay_traffic, latency_scale=replay_latency_scale
+                )
+            )
+        elif record_traffic:
+            transport = RequestsTransport(
+                adapter=RecordingAdapter(
+                    record_traffic, pool_maxsize=max_workers
+                )
+            )
+        self._client = DNSClient(
+            provider_version,
+            token,
+            max_connections=max_workers,
+            transport=transport,
+            page_size=page_size,
+            adaptive_page_size=adaptive_page_size,
+            metrics=self.metrics,
+            rate_limiter=rate_limiter,
+        )
+        self._prefetch = prefetch
+        self._max_workers = max_workers
+        self._pipeline_depth = pipeline_depth
+        self._single_flight = SingleFlight()
         self._zones = self.group_existing_zones_by_name()
         self._zone_rrsets = {}
+        # zones whose listing in _zone_rrsets was prefetched and not yet
+        # served by populate
+        self._prefetched = set()
+        self._fingerprints = {}
+        self._snapshots = None
+        if snapshot_file:
+            self._snapshots = ZoneSnapshots(snapshot_file)
+        elif in_memory_snapshots:
+            # for long-running processes that plan the same zones repeatedly
+            self._snapshots = ZoneSnapshots()
+        self._desired_digests = {}
+        self._observed = {}
+
+    def owns_zone(self, zone_name):
+        return (
+            self.shard_count == 1
+            or shard_of(idna_decode(zone_name), self.shard_count)
+            == self.shard_index
+        )
+
+    def _check_shard(self, zone_name):
+        if not self.owns_zone(zone_name):
+            raise SelectelException(
+                f'Zone {zone_name} belongs to shard '
+                f'{shard_of(zone_name, self.shard_count)}, '
+                f'not {self.shard_index}'
+            )
+
+    def plan(self, desired, processors=[]):
+        if not self.owns_zone(desired.name):
+            self.log.info(
+                'plan: zone %s belongs to another shard, skipping', desired.name
+            )
+            self.metrics.add('shard.skipped_zones')
+            return None
+        start = perf_counter()
+        try:
+            plan = self._plan(desired, processors)
+        finally:
+            # the fingerprints of existing records are only needed while
+            # planning, records and zones must not outlive the plan
+            self._fingerprints.pop(desired.name, None)
+        self.metrics.add('shard.zones')
+        self.metrics.add('shard.plan.seconds', perf_counter() - start)
+        return plan
+
+    def _plan(self, desired, processors):
+        if self._snapshots is None:
+            return super().plan(desired, processors=processors)
+        zone_name = idna_decode(desired.name)
+        digest = zone_digest(desired, self.SUPPORTS, self.MIN_TTL)
+        self._desired_digests[zone_name] = digest
+        plan = super().plan(desired, processors=processors)
+        observed = self._observed.pop(zone_name, None)
+        if plan is None and observed is not None:
+            serial, rrsets = observed
+            self._snapshots.save(zone_name, digest, serial, rrsets)
+        else:
+            self._snapshots.discard(zone_name)
+        return plan
+
+    def flush_snapshots(self):
+        '''
+        Writes pending zone snapshots to snapshot_file now instead of in
+        batches and at exit, e.g. at the end of a sync.
+        '''
+        if self._snapshots is not None:
+            self._snapshots.flush()
+
+    def _record_fingerprint(self, record):
+        # Existing records get their fingerprint computed once in populate,
+        # the cache entry is only valid for that exact record instance.
+        cached = self._fingerprints.get(record.zone.name, {}).get(id(record))
+        if cached is not None and cached[0] is record:
+            return cached[1]
+        return record_fingerprint(record, self.MIN_TTL)
 
     def _include_change(self, change):
         if isinstance(change, Update):
-            existing = change.existing.data
-            new = change.new.data
-            new['ttl'] = max(self.MIN_TTL, new['ttl'])
-            if isinstance(change.new, SshfpRecord):
-                for i in range(0, len(change.new.rr_values)):
-                    change.new.rr_values[i].fingerprint = change.new.rr_values[
-                        i
-                    ].fingerprint.lower()
+            existing = self._record_fingerprint(change.existing)
+            new = self._record_fingerprint(change.new)
             if new == existing:
                 self.log.debug(
-                    '_include_changes: new=%s, found existing=%s', new, existing
+                    '_include_changes: new=%s, found existing=%s',
+                    change.new,
+                    change.existing,
                 )
                 return False
         return True
@@ -66,6 +246,9 @@ class SelectelProvider(BaseProvider):
         self.log.debug(
             '_apply: zone=%s, len(changes)=%d', zone_name, len(changes)
         )
+        self._check_shard(zone_name)
+        start = perf_counter()
+        self._validate(zone_name, desired, changes)
         if not self._is_zone_already_created(zone_name):
             self.create_zone(zone_name)
         zone_id = self._get_zone_id_by_name(zone_name)
@@ -77,18 +260,67 @@ class SelectelProvider(BaseProvider):
                 self._apply_update(zone_id, change)
             if action == 'delete':
                 self._apply_delete(zone_id, change)
+        # The zone has changed, cached rrsets must not outlive the apply.
+        self._zone_rrsets.pop(zone_name, None)
+        self._prefetched.discard(zone_name)
+        self.metrics.add('shard.apply.seconds', perf_counter() - start)
+
+    def _validate(self, zone_name, desired, changes):
+        # Runs before the first request, a payload the API would reject must
+        # not leave the zone half applied.
+        problems = validate_rrsets(
+            (
+                to_selectel_rrset(change.new)
+                for change in changes
+                if not isinstance(change, Delete)
+            ),
+            self.MIN_TTL,
+        )
+        problems.extend(
+            cname_conflicts(
+                record
+                for record in desired.records
+                if record._type in self.SUPPORTS
+            )
+        )
+        if problems:
+            raise SelectelValidationFailed(zone_name, problems)
 
     def _is_zone_already_created(self, zone_name):
         return zone_name in self._zones.keys()
 
     def _get_rrset_id(self, zone_name, rrset_type, rrset_name):
-        return next(
-            filter(
-                lambda rrset: rrset["type"] == rrset_type
-                and rrset["name"] == rrset_name,
-                self._zone_rrsets[zone_name],
+        rrset = self.get_rrset(zone_name, rrset_type, rrset_name)
+        if rrset is None:
+            raise SelectelException(
+                f'rrset {rrset_name} {rrset_type} not found in {zone_name}'
             )
-        )["id"]
+        return rrset["id"]
+
+    def get_rrset(self, zone_name, rrset_type, rrset_name):
+        rrsets = self._zone_rrsets.get(zone_name)
+        if rrsets is None:
+            # The zone is not listed, fetch only the rrset in question
+            # instead of the whole zone.
+            self.log.debug(
+                'View rrset. Zone: %s, type: %s, name: %s',
+                zone_name,
+                rrset_type,
+                rrset_name,
+            )
+            rrsets = self._client.list_rrsets(
+                self._get_zone_id_by_name(zone_name),
+                rrset_types=rrset_type,
+                name=rrset_name,
+            )
+        return next(
+            (
+                rrset
+                for rrset in rrsets
+                if rrset["type"] == rrset_type and rrset["name"] == rrset_name
+            ),
+            None,
+        )
 
     def _apply_create(self, zone_id, change):
         new_record = change.new
@@ -122,26 +354,145 @@ class SelectelProvider(BaseProvider):
             target,
             lenient,
         )
+        # Populating a zone of another shard would return it empty, a sync
+        # using this provider as a source would then delete its records.
+        self._check_shard(zone_name)
+        if self._prefetch:
+            zone_names = self._prefetch
+            self._prefetch = None
+            self.prefetch(zone_names)
         before = len(zone.records)
         rrsets = []
+        digest = self._desired_digests.pop(zone_name, None)
         if self._is_zone_already_created(zone_name):
-            rrsets = self.list_rrsets(zone)
+            if target and digest is not None:
+                # reuses a prefetched listing that is still current and may
+                # replace it with the snapshot, later populates list again
+                self._prefetched.discard(zone_name)
+                rrsets = self._list_rrsets_with_snapshot(zone, digest)
+            elif zone_name in self._prefetched:
+                # a prefetched listing is served once, later populates list
+                # the zone again to see remote changes
+                self._prefetched.discard(zone_name)
+                rrsets = self._zone_rrsets[zone_name]
+            elif self._pipeline_depth:
+                rrsets = self._iter_rrsets_pipelined(zone_name)
+            else:
+                rrsets = self.list_rrsets(zone)
+        records = self._new_records(zone, rrsets, lenient)
+        fingerprints = (
+            self._fingerprints.setdefault(zone.name, {}) if target else None
+        )
+        for record in records:
+            zone.add_record(record)
+            if target:
+                fingerprints[id(record)] = (
+                    record,
+                    record_fingerprint(record, self.MIN_TTL),
+                )
+        self.log.info('populate: found %s records', len(zone.records) - before)
+        exists = zone.name in self._zones
+        return exists
+
+    def _new_records(self, zone, rrsets, lenient):
         for rrset in rrsets:
             rrset_type = rrset['type']
             if rrset_type in self.SUPPORTS:
                 record_data = to_octodns_record_data(rrset)
-                rrset_hostname = zone.hostname_from_fqdn(rrset['name'])
-                record = Record.new(
+                rrset_hostname = hostname_from_fqdn(rrset['name'], zone.name)
+                yield Record.new(
                     zone,
                     rrset_hostname,
                     record_data,
                     source=self,
                     lenient=lenient,
                 )
-                zone.add_record(record)
-        self.log.info('populate: found %s records', len(zone.records) - before)
-        exists = zone.name in self._zones
-        return exists
+
+    def _is_managed(self, name, _type):
+        # root NS records are managed by Selectel
+        return _type in self.SUPPORTS and not (name == '' and _type == 'NS')
+
+    def iter_changes(self, desired, lenient=False):
+        '''
+        Streams the changes turning the remote zone into desired without
+        populating it. The rrsets arrive sorted by name descending and are
+        merge-joined with the desired records sorted the same way, so only a
+        page of rrsets is held in memory. Meant for zones too large for a
+        regular plan.
+        '''
+        zone_name = idna_decode(desired.name)
+        records = sorted(
+            (
+                record
+                for record in desired.records
+                if self._is_managed(record.name, record._type)
+            ),
+            key=lambda record: idna_decode(record.fqdn),
+            reverse=True,
+        )
+        if self._is_zone_already_created(zone_name):
+            zone_id = self._get_zone_id_by_name(zone_name)
+            pages = self._client.iter_rrset_pages(zone_id, self._listed_types)
+            if self._pipeline_depth:
+                pages = iter_pipelined(pages, self._pipeline_depth)
+            rrsets = (rrset for page in pages for rrset in page)
+        else:
+            rrsets = []
+        scratch = Zone(desired.name, [])
+        joined = merge_join(
+            rrsets,
+            records,
+            key=lambda item: (
+                item['name']
+                if isinstance(item, dict)
+                else idna_decode(item.fqdn)
+            ),
+        )
+        for fqdn, rrsets, records in joined:
+            name = hostname_from_fqdn(fqdn, desired.name)
+            existing = {
+                rrset['type']: Record.new(
+                    scratch,
+                    name,
+                    to_octodns_record_data(rrset),
+                    source=self,
+                    lenient=lenient,
+                )
+                for rrset in rrsets
+                if self._is_managed(name, rrset['type'])
+            }
+            for record in records:
+                current = existing.pop(record._type, None)
+                if current is None:
+                    yield Create(record)
+                elif self._include_change(Update(current, record)):
+                    yield Update(current, record)
+            for current in existing.values():
+                yield Delete(current)
+
+    def _list_rrsets_with_snapshot(self, zone, digest):
+        zone_name = idna_decode(zone.name)
+        zone_id = self._get_zone_id_by_name(zone_name)
+        # Read the serial before listing, a change racing with the listing
+        # leaves an outdated serial behind and only costs a full populate.
+        serial = soa_serial(self._client.list_rrsets(zone_id, 'SOA'))
+        rrsets = self._snapshots.get(zone_name, digest, serial)
+        cached = self._zone_rrsets.get(zone_name)
+        if rrsets is not None:
+            self.log.info(
+                'populate: zone %s unchanged since serial %s, using snapshot',
+                zone_name,
+                serial,
+            )
+            self._zone_rrsets[zone_name] = rrsets
+        else:
+            if cached is None or soa_serial(cached) != serial:
+                cached = self.list_rrsets(zone)
+            rrsets = [
+                rrset for rrset in cached if rrset['type'] in self.SUPPORTS
+            ]
+        self._observed[zone_name] = (serial, rrsets)
+        return rrsets
 
     def _get_zone_id_by_name(self, zone_name):
         return self._zones.get(zone_name, False)["id"]
@@ -155,20 +506,68 @@ class SelectelProvider(BaseProvider):
     def list_zones(self):
         # This method is called dynamically in octodns.Manager._preprocess_zones()
         # and required for use of "*" if provider is source.
-        return [zone_name for zone_name in self._zones]
+        return [
+            zone_name for zone_name in self._zones if self.owns_zone(zone_name)
+        ]
 
     def group_existing_zones_by_name(self):
         self.log.debug('View zones')
-        return {zone['name']: zone for zone in self._client.list_zones()}
+        zones = self._single_flight.do('zones', self._client.list_zones)
+        return {zone['name']: zone for zone in zones}
 
     def list_rrsets(self, zone):
-        zone_name = idna_decode(zone.name)
+        return self._list_rrsets_by_name(idna_decode(zone.name))
+
+    def _list_rrsets_by_name(self, zone_name):
         self.log.debug('View rrsets. Zone: %s', zone_name)
         zone_id = self._get_zone_id_by_name(zone_name)
-        zone_rrsets = self._client.list_rrsets(zone_id)
+        zone_rrsets = self._single_flight.do(
+            ('rrsets', zone_id),
+            self._client.list_rrsets,
+            zone_id,
+            keep_types=self._listed_types,
+        )
         self._zone_rrsets[zone_name] = zone_rrsets
         return zone_rrsets
 
+    def _iter_rrsets_pipelined(self, zone_name):
+        self.log.debug('View rrsets pipelined. Zone: %s', zone_name)
+        zone_id = self._get_zone_id_by_name(zone_name)
+        pages = self._client.iter_rrset_pages(zone_id, self._listed_types)
+        zone_rrsets = []
+        for page in iter_pipelined(pages, self._pipeline_depth):
+            zone_rrsets.extend(page)
+            yield from page
+        self._zone_rrsets[zone_name] = zone_rrsets
+
+    def prefetch(self, zone_names):
+        zone_names = [
+            zone_name
+            for zone_name in map(idna_decode, zone_names)
+            if self._is_zone_already_created(zone_name)
+            and zone_name not in self._prefetched
+        ]
+        self.log.info(
+            'prefetch: %d zones, max_workers=%d',
+            len(zone_names),
+            self._max_workers,
+        )
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = {
+                executor.submit(self._list_rrsets_by_name, zone_name): zone_name
+                for zone_name in zone_names
+            }
+        for future, zone_name in futures.items():
+            if exception := future.exception():
+                # populate lists the zone again and reports the error there
+                self.log.warning(
+                    'prefetch: failed to list rrsets of %s. %s',
+                    zone_name,
+                    exception,
+                )
+            else:
+                self._prefetched.add(zone_name)
+
     def create_rrset(self, zone_id, data):
         self.log.debug('Create rrset. Zone id: %s, data %s', zone_id, data)
         return self._client.create_rrset(zone_id, data)
@@ -0,0 +1,16 @@
+from hashlib import blake2b
+
+
+def _weight(zone_name, shard):
+    key = f'{shard}:{zone_name}'.encode()
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), 'big')
+
+
+def shard_of(zone_name, shard_count):
+    '''
+    Rendezvous hashing: a zone belongs to the shard giving it the highest
+    weight. The owner only depends on the zone name and the shard count, so
+    adding or removing zones never moves other zones, and changing the
+    shard count only moves the zones the new or removed shards win or lose.
+    '''
+    return max(range(shard_count), key=lambda shard: _weight(zone_name, shard))
@@ -0,0 +1,31 @@
+from concurrent.futures import Future
+from threading import Lock
+
+
+class SingleFlight:
+    '''
+    Coalesces concurrent calls sharing a key: the first caller runs the
+    function, callers arriving while it is in flight wait for and share its
+    result or exception.
+    '''
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exception:
+            future.set_exception(exception)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
@@ -0,0 +1,88 @@
+from atexit import register
+from hashlib import blake2b
+from json import dump, load
+from os import replace
+from os.path import exists
+from threading import Lock
+
+from .mappings import canonical_record
+
+
+def zone_digest(zone, supports, min_ttl=0):
+    canonical = sorted(
+        (record.name, canonical_record(record, min_ttl))
+        for record in zone.records
+        if record._type in supports
+    )
+    return blake2b(repr(canonical).encode(), digest_size=16).hexdigest()
+
+
+def soa_serial(rrsets):
+    for rrset in rrsets:
+        if rrset["type"] == "SOA":
+            return rrset["records"][0]["content"].split(" ")[2]
+    return None
+
+
+class ZoneSnapshots:
+    '''
+    Last known in-sync state of zones: the digest of the desired zone, the
+    remote SOA serial and the supported rrsets observed at that moment.
+    With a path the snapshots are kept in a JSON file between runs. The file
+    is rewritten once flush_every zones changed and at exit, not per zone.
+    '''
+
+    def __init__(self, path=None, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self._lock = Lock()
+        self._snapshots = {}
+        self._pending = 0
+        if path:
+            if exists(path):
+                with open(path) as fh:
+                    self._snapshots = load(fh)
+            # snapshots are a cache, the ones lost when the process dies
+            # before flushing only cost a full populate of their zones
+            register(self.flush)
+
+    def get(self, zone_name, digest, serial):
+        snapshot = self._snapshots.get(zone_name)
+        if (
+            snapshot is not None
+            and serial is not None
+            and snapshot["digest"] == digest
+            and snapshot["serial"] == serial
+        ):
+            return snapshot["rrsets"]
+        return None
+
+    def save(self, zone_name, digest, serial, rrsets):
+        snapshot = dict(digest=digest, serial=serial, rrsets=rrsets)
+        with self._lock:
+            if self._snapshots.get(zone_name) == snapshot:
+                return
+            self._snapshots[zone_name] = snapshot
+            self._pending += 1
+        self._maybe_flush()
+
+    def discard(self, zone_name):
+        with self._lock:
+            if self._snapshots.pop(zone_name, None) is None:
+                return
+            self._pending += 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self.path or not self._pending:
+                return
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w') as fh:
+                dump(self._snapshots, fh)
+            replace(tmp_path, self.path)
+            self._pending = 0
@@ -0,0 +1,113 @@
+from itertools import count
+from threading import Lock
+from urllib.parse import urlsplit
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from .decoding import loads
+
+
+class RequestsTransport:
+    '''
+    Sends requests over HTTP with a pooled requests session. adapter replaces
+    the default connection pool, e.g. with a recording or replay adapter.
+    '''
+
+    def __init__(self, max_connections=10, adapter=None):
+        self._sess = Session()
+        self._sess.mount(
+            'https://', adapter or HTTPAdapter(pool_maxsize=max_connections)
+        )
+
+    def request(self, method, url, params=None, json=None, headers=None):
+        resp = self._sess.request(
+            method, url, params=params, json=json, headers=headers
+        )
+        try:
+            body = loads(resp.content)
+        except ValueError:
+            body = {}
+        return resp.status_code, body
+
+
+class MemoryTransport:
+    '''
+    In-process stand-in for the v2 API without any network or HTTP stack.
+    Zones and rrsets live in dicts, listings are paginated and sorted like
+    the API does, so the provider's own cost can be measured in isolation.
+    '''
+
+    def __init__(self, zones=None):
+        self._lock = Lock()
+        self._ids = count(1)
+        self._zones = {}
+        self._rrsets = {}
+        for name, rrsets in (zones or {}).items():
+            zone_id = self._create_zone(name)['id']
+            for rrset in rrsets:
+                self._create_rrset(zone_id, rrset)
+
+    def _create_zone(self, name):
+        zone = dict(id=f'zone-{next(self._ids)}', name=name)
+        self._zones[zone['id']] = zone
+        self._rrsets[zone['id']] = {}
+        return zone
+
+    def _create_rrset(self, zone_id, data):
+        rrset = dict(data, id=f'rrset-{next(self._ids)}', zone_id=zone_id)
+        self._rrsets[zone_id][rrset['id']] = rrset
+        return rrset
+
+    def _page(self, items, params):
+        limit = int(params.get('limit', 1000))
+        offset = int(params.get('offset', 0))
+        next_offset = offset + limit
+        return dict(
+            result=items[offset:next_offset],
+            limit=limit,
+            next_offset=next_offset if next_offset < len(items) else 0,
+        )
+
+    def _list_rrsets(self, zone_id, params):
+        types = params.get('rrset_types')
+        types = set(types.split(',')) if types else None
+        rrsets = [
+            rrset
+            for rrset in self._rrsets[zone_id].values()
+            if (types is None or rrset['type'] in types)
+            and params.get('name', rrset['name']) == rrset['name']
+            and params.get('search', '') in rrset['name']
+        ]
+        rrsets.sort(key=lambda rrset: rrset['name'], reverse=True)
+        return self._page(rrsets, params)
+
+    def request(self, method, url, params=None, json=None, headers=None):
+        parts = urlsplit(url).path.split('/zones', 1)[1].strip('/').split('/')
+        params = params or {}
+        with self._lock:
+            if parts == ['']:
+                if method == 'POST':
+                    return 201, self._create_zone(json['name'])
+                zones = sorted(
+                    self._zones.values(),
+                    key=lambda zone: zone['name'],
+                    reverse=True,
+                )
+                return 200, self._page(zones, params)
+            zone_id = parts[0]
+            if zone_id not in self._zones:
+                return 404, dict(error='zone not found')
+            rrsets = self._rrsets[zone_id]
+            if len(parts) == 2:
+                if method == 'POST':
+                    return 201, self._create_rrset(zone_id, json)
+                return 200, self._list_rrsets(zone_id, params)
+            rrset_id = parts[2]
+            if rrset_id not in rrsets:
+                return 404, dict(error='rrset not found')
+            if method == 'PATCH':
+                rrsets[rrset_id].update(json)
+            else:
+                del rrsets[rrset_id]
+            return 204, {}
@@ -0,0 +1,69 @@
+import re
+
+from .exceptions import SelectelException
+
+_CONTENT_PATTERNS = {
+    'CAA': re.compile(r'(\d{1,3}) [a-zA-Z0-9]+ ".*"'),
+    'MX': re.compile(r'\d{1,5} \S+'),
+    'SRV': re.compile(r'(\d{1,5}) (\d{1,5}) (\d{1,5}) \S+'),
+    'SSHFP': re.compile(r'[0-9]{1,3} [0-9]{1,3} [0-9a-fA-F]+'),
+}
+
+
+class SelectelValidationFailed(SelectelException):
+    def __init__(self, zone_name, problems):
+        details = '\n  '.join(problems)
+        super().__init__(
+            f'{len(problems)} invalid rrsets in {zone_name}:\n  {details}'
+        )
+        self.problems = problems
+
+
+def _content_problem(_type, content):
+    pattern = _CONTENT_PATTERNS.get(_type)
+    if pattern is None:
+        return None
+    match = pattern.fullmatch(content)
+    if match is None:
+        return f'malformed content "{content}"'
+    if _type == 'CAA' and int(match.group(1)) > 255:
+        return f'CAA flags out of range in "{content}"'
+    if _type == 'SRV' and any(int(field) > 65535 for field in match.groups()):
+        return f'SRV field out of range in "{content}"'
+    return None
+
+
+def validate_rrsets(rrsets, min_ttl):
+    '''
+    Checks outgoing rrsets against the rules the API is known to enforce and
+    returns every problem found, an empty list for valid rrsets.
+    '''
+    problems = []
+    for rrset in rrsets:
+        prefix = f'{rrset["name"]} {rrset["type"]}'
+        if rrset['ttl'] < min_ttl:
+            problems.append(f'{prefix}: ttl {rrset["ttl"]} below {min_ttl}')
+        if not rrset['records']:
+            problems.append(f'{prefix}: no records')
+        for record in rrset['records']:
+            problem = _content_problem(rrset['type'], record['content'])
+            if problem is not None:
+                problems.append(f'{prefix}: {problem}')
+    return problems
+
+
+def cname_conflicts(records):
+    '''
+    Returns a problem for every name that has a CNAME next to other data.
+    '''
+    types = {}
+    for record in records:
+        types.setdefault(record.fqdn, set()).add(record._type)
+    problems = []
+    for fqdn, name_types in sorted(types.items()):
+        others = sorted(name_types - {'CNAME'})
+        if 'CNAME' in name_types and others:
+            problems.append(
+                f'{fqdn} CNAME: other data at the same name ({", ".join(others)})'
+            )
+    return problems
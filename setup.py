@@ -26,6 +26,12 @@ setup(
     author='Ross McFarland',
     author_email='rwmcfa1@gmail.com',
     description=description,
+    entry_points={
+        'console_scripts': (
+            'octodns-selectel-daemon = octodns_selectel.daemon:main',
+            'octodns-selectel-migrate = octodns_selectel.migrate:main',
+        )
+    },
     extras_require={
         'dev': tests_require
         + (
@@ -42,6 +48,8 @@ setup(
             'readme_renderer[md]>=26.0',
             'twine>=3.4.2',
         ),
+        # faster decoding of API responses
+        'orjson': ('orjson>=3.0.0',),
         'test': tests_require,
     },
     install_requires=('octodns>=1.5.0', 'requests>=2.27.0'),
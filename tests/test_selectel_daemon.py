@@ -0,0 +1,167 @@
+from os import utime
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+import requests_mock
+
+from octodns_selectel.daemon import Daemon, main
+from octodns_selectel.v2.dns_client import DNSClient
+
+CONFIG = '''
+providers:
+  config:
+    class: octodns.provider.yaml.YamlProvider
+    directory: {directory}
+    supports_root_ns: false
+  selectel:
+    class: octodns_selectel.SelectelProvider
+    token: token
+    in_memory_snapshots: true
+zones:
+  unit.tests.:
+    sources:
+      - config
+    targets:
+      - selectel
+'''
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+        self.sleeps = []
+
+    def __call__(self):
+        self.now += 0.5
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+
+class TestSelectelDaemon(TestCase):
+    zone_id = 'zone-id'
+
+    def setUp(self):
+        self.serial = 1
+        self.rrsets = []
+
+    def _soa(self):
+        return dict(
+            id='soa',
+            name='unit.tests.',
+            type='SOA',
+            ttl=3600,
+            records=[dict(content=f'a. b. {self.serial} 2 3 4 5')],
+        )
+
+    def _mock_api(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=[dict(id=self.zone_id, name='unit.tests.')],
+                limit=1,
+                next_offset=0,
+            ),
+        )
+
+        def listing(request, context):
+            rrsets = [self._soa()]
+            if 'rrset_types' not in request.qs:
+                rrsets += self.rrsets
+            return dict(result=rrsets, limit=len(rrsets), next_offset=0)
+
+        def create(request, context):
+            self.serial += 1
+            self.rrsets.append(dict(request.json(), id='created'))
+            return self.rrsets[-1]
+
+        def update(request, context):
+            self.serial += 1
+            self.rrsets[0].update(request.json())
+            context.status_code = 204
+
+        path = f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset'
+        fake_http.patch(f'{path}/created', json=update)
+        return fake_http.get(path, json=listing), fake_http.post(
+            path, json=create
+        )
+
+    def _write(self, path, content):
+        with open(path, 'w') as fh:
+            fh.write(content)
+
+    @requests_mock.Mocker()
+    def test_cycles(self, fake_http):
+        listing, created = self._mock_api(fake_http)
+        clock = FakeClock()
+        with TemporaryDirectory() as tmpdir:
+            config_file = join(tmpdir, 'config.yaml')
+            self._write(config_file, CONFIG.format(directory=tmpdir))
+            zone_file = join(tmpdir, 'unit.tests.yaml')
+            self._write(zone_file, 'www:\n  type: A\n  value: 1.2.3.4\n')
+            daemon = Daemon(
+                config_file,
+                interval=10,
+                dry_run=False,
+                clock=clock,
+                sleep=clock.sleep,
+            )
+
+            def full_listings():
+                return sum(
+                    1
+                    for request in listing.request_history
+                    if 'rrset_types' not in request.qs
+                )
+
+            # creates the record, finds the zone in sync and then only
+            # checks its SOA serial
+            daemon.run(3)
+            self.assertEqual(1, created.call_count)
+            self.assertEqual(2, full_listings())
+            self.assertEqual([9.5, 9.5], clock.sleeps)
+            self.assertEqual(
+                {'cycles': 3, 'cycle.seconds': 0.5, 'cycle.changes': 0},
+                daemon.metrics.snapshot(),
+            )
+            daemon.cycle()
+            self.assertEqual(2, full_listings())
+
+            # a moved serial lists the zone again
+            self.serial += 1
+            daemon.cycle()
+            self.assertEqual(3, full_listings())
+
+            # a changed desired zone is planned against the rrsets in memory
+            self._write(zone_file, 'www:\n  type: A\n  value: 4.3.2.1\n')
+            daemon.cycle()
+            self.assertEqual(3, full_listings())
+            self.assertEqual(1, daemon.metrics.get('cycle.changes'))
+            self.assertEqual('4.3.2.1', self.rrsets[0]['records'][0]['content'])
+
+            # a changed config file starts over with new providers
+            manager = daemon.manager()
+            self.assertIs(manager, daemon.manager())
+            utime(config_file, (1, 1))
+            self.assertIsNot(manager, daemon.manager())
+
+    def test_failed_cycle(self):
+        with TemporaryDirectory() as tmpdir:
+            config_file = join(tmpdir, 'config.yaml')
+            self._write(config_file, '')
+            manager_factory = Mock(side_effect=Exception('broken config'))
+            daemon = Daemon(config_file, manager_factory=manager_factory)
+
+            with self.assertLogs(daemon.log, 'ERROR'):
+                daemon.cycle()
+        self.assertEqual(1, daemon.metrics.get('cycle.errors'))
+        self.assertIsNone(daemon.metrics.get('cycle.changes'))
+
+    def test_main(self):
+        with patch('octodns_selectel.daemon.Daemon') as daemon:
+            main(['--config-file', 'config.yaml', '--doit', '--cycles', '2'])
+        daemon.assert_called_once_with('config.yaml', 60, dry_run=False)
+        daemon.return_value.run.assert_called_once_with(2)
@@ -0,0 +1,21 @@
+from unittest import TestCase
+
+from octodns_selectel.metrics import Metrics
+
+
+class TestSelectelMetrics(TestCase):
+    def test_metrics(self):
+        metrics = Metrics()
+        self.assertIsNone(metrics.get('pages'))
+        self.assertEqual(0, metrics.get('pages', 0))
+
+        metrics.add('pages')
+        metrics.add('pages', 2)
+        metrics.set('page_size', 500)
+        snapshot = metrics.snapshot()
+        self.assertEqual(dict(pages=3, page_size=500), snapshot)
+
+        # snapshots are copies
+        metrics.set('page_size', 1000)
+        self.assertEqual(500, snapshot['page_size'])
+        self.assertEqual(1000, metrics.get('page_size'))
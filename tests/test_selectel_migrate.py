@@ -0,0 +1,304 @@
+from json import dump, load
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests_mock
+
+from octodns_selectel.migrate import (
+    Checkpoint,
+    Migration,
+    SelectelMigrationFailed,
+    main,
+)
+from octodns_selectel.v1.provider import (
+    SelectelProvider as SelectelProviderLegacy,
+)
+from octodns_selectel.v2.dns_client import DNSClient
+from octodns_selectel.v2.provider import SelectelProvider
+
+
+class TestSelectelMigration(TestCase):
+    V1_URL = SelectelProviderLegacy.API_URL
+    V2_URL = DNSClient.API_URL
+    zone_id = 'zone-id'
+    v1_records = [
+        dict(
+            name='unit.tests', type='NS', ttl=3600, content='ns1.selectel.org'
+        ),
+        dict(name='www.unit.tests', type='A', ttl=300, content='1.2.3.4'),
+        dict(name='www.unit.tests', type='A', ttl=300, content='5.6.7.8'),
+        dict(name='unit.tests', type='TXT', ttl=300, content='v=spf1; -all'),
+        dict(
+            name='mail.unit.tests',
+            type='CNAME',
+            ttl=30,
+            content='mx.unit.tests',
+        ),
+    ]
+
+    def _mock_apis(self, fake_http, zones=[], rrsets=None, fail=None):
+        fake_http.get(f'{self.V1_URL}/', json=[dict(name='unit.tests', id=1)])
+        fake_http.head(f'{self.V1_URL}/', headers={'X-Total-Count': '1'})
+        fake_http.get(
+            f'{self.V1_URL}/unit.tests/records/', json=self.v1_records
+        )
+        fake_http.head(
+            f'{self.V1_URL}/unit.tests/records/',
+            headers={'X-Total-Count': str(len(self.v1_records))},
+        )
+        fake_http.get(
+            f'{self.V2_URL}/zones',
+            json=dict(result=zones, limit=len(zones), next_offset=0),
+        )
+        fake_http.post(
+            f'{self.V2_URL}/zones',
+            json=dict(id=self.zone_id, name='unit.tests.'),
+        )
+        rrsets = (
+            [
+                dict(
+                    name='unit.tests.',
+                    type='SOA',
+                    ttl=3600,
+                    records=[dict(content='a. b. 1 2 3 4 5')],
+                ),
+                dict(
+                    name='unit.tests.',
+                    type='NS',
+                    ttl=3600,
+                    records=[dict(content='a.ns.selectel.ru.')],
+                ),
+            ]
+            if rrsets is None
+            else rrsets
+        )
+
+        def create(request, context):
+            rrset = request.json()
+            if rrset['type'] == fail:
+                context.status_code = 500
+                return {}
+            rrsets.append(dict(rrset, id=f'{rrset["name"]}{rrset["type"]}'))
+            return rrsets[-1]
+
+        fake_http.get(
+            f'{self.V2_URL}/zones/{self.zone_id}/rrset',
+            json=lambda request, context: dict(
+                result=rrsets, limit=len(rrsets), next_offset=0
+            ),
+        )
+        return fake_http.post(
+            f'{self.V2_URL}/zones/{self.zone_id}/rrset', json=create
+        )
+
+    def _migration(self, checkpoint=None):
+        return Migration(
+            SelectelProviderLegacy('legacy', 'v1-token'),
+            SelectelProvider('current', 'v2-token'),
+            checkpoint=checkpoint,
+            max_workers=2,
+        )
+
+    @requests_mock.Mocker()
+    def test_run(self, fake_http):
+        created = self._mock_apis(fake_http)
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'checkpoint.json')
+            migration = self._migration(Checkpoint(path))
+
+            self.assertEqual({}, migration.run(['unit.tests']))
+            with open(path) as fh:
+                self.assertEqual(dict(zones={}, done=['unit.tests.']), load(fh))
+
+        self.assertEqual(
+            [
+                dict(
+                    name='mail.unit.tests.',
+                    ttl=30,
+                    type='CNAME',
+                    records=[dict(content='mx.unit.tests.')],
+                ),
+                dict(
+                    name='unit.tests.',
+                    ttl=300,
+                    type='TXT',
+                    records=[dict(content='"v=spf1; -all"')],
+                ),
+                dict(
+                    name='www.unit.tests.',
+                    ttl=300,
+                    type='A',
+                    records=[dict(content='1.2.3.4'), dict(content='5.6.7.8')],
+                ),
+            ],
+            sorted(
+                (r.json() for r in created.request_history),
+                key=lambda rrset: rrset['name'],
+            ),
+        )
+
+        # a finished zone is only verified again
+        self.assertEqual({}, migration.run(['unit.tests.']))
+        self.assertEqual(3, created.call_count)
+
+    @requests_mock.Mocker()
+    def test_resume(self, fake_http):
+        created = self._mock_apis(fake_http, fail='TXT')
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'checkpoint.json')
+            with open(path, 'w') as fh:
+                dump(
+                    dict(zones={'unit.tests.': ['www.unit.tests. A']}, done=[]),
+                    fh,
+                )
+
+            migration = self._migration(Checkpoint(path))
+            with self.assertLogs(migration.log, 'WARNING'):
+                with self.assertRaises(SelectelMigrationFailed) as ctx:
+                    migration.migrate_zone('unit.tests.')
+            self.assertEqual(
+                ['unit.tests. TXT'], [k for k, _ in ctx.exception.failures]
+            )
+            self.assertTrue(
+                str(ctx.exception).startswith(
+                    'Failed to migrate 1 rrsets of unit.tests.: '
+                    'unit.tests. TXT: '
+                )
+            )
+            self.assertEqual(
+                ['mail.unit.tests.', 'unit.tests.'],
+                sorted(r.json()['name'] for r in created.request_history),
+            )
+
+            # the next attempt only creates what is still missing
+            with open(path) as fh:
+                self.assertEqual(
+                    dict(
+                        zones={
+                            'unit.tests.': [
+                                'mail.unit.tests. CNAME',
+                                'www.unit.tests. A',
+                            ]
+                        },
+                        done=[],
+                    ),
+                    load(fh),
+                )
+            created = self._mock_apis(
+                fake_http, zones=[dict(id=self.zone_id, name='unit.tests.')]
+            )
+            self._migration(Checkpoint(path)).migrate_zone('unit.tests.')
+            self.assertEqual(
+                ['unit.tests.'],
+                [r.json()['name'] for r in created.request_history],
+            )
+
+    @requests_mock.Mocker()
+    def test_resume_after_lost_response(self, fake_http):
+        self._mock_apis(fake_http)
+
+        def create(request, context):
+            # the rrset is created, but the response never arrives
+            rrsets.append(dict(request.json(), id='created'))
+            context.status_code = 504
+            return {}
+
+        rrsets = []
+        fake_http.post(f'{self.V2_URL}/zones/{self.zone_id}/rrset', json=create)
+        migration = self._migration()
+        with self.assertLogs(migration.log, 'WARNING'):
+            with self.assertRaises(SelectelMigrationFailed):
+                migration.migrate_zone('unit.tests.')
+        self.assertEqual({}, migration.checkpoint._zones)
+
+        # the zone now exists and already has every rrset
+        created = self._mock_apis(
+            fake_http,
+            zones=[dict(id=self.zone_id, name='unit.tests.')],
+            rrsets=rrsets,
+        )
+        migration = self._migration(migration.checkpoint)
+        self.assertEqual({}, migration.run(['unit.tests.']))
+        self.assertEqual(0, created.call_count)
+
+    def test_checkpoint_flushed_in_batches(self):
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'checkpoint.json')
+            checkpoint = Checkpoint(path, flush_every=2)
+            checkpoint.add('unit.tests.', 'a.unit.tests. A')
+            self.assertFalse(exists(path))
+            checkpoint.add('unit.tests.', 'b.unit.tests. A')
+            checkpoint.add('unit.tests.', 'c.unit.tests. A')
+            with open(path) as fh:
+                self.assertEqual(
+                    ['a.unit.tests. A', 'b.unit.tests. A'],
+                    load(fh)['zones']['unit.tests.'],
+                )
+
+            checkpoint.flush()
+            self.assertEqual(
+                {'a.unit.tests. A', 'b.unit.tests. A', 'c.unit.tests. A'},
+                Checkpoint(path).created('unit.tests.'),
+            )
+            # nothing pending, nothing written
+            with patch('octodns_selectel.migrate.replace') as replace:
+                checkpoint.flush()
+            replace.assert_not_called()
+
+            checkpoint.finish('unit.tests.')
+            self.assertTrue(Checkpoint(path).is_done('unit.tests.'))
+
+    @requests_mock.Mocker()
+    def test_run_reports_mismatches(self, fake_http):
+        rrsets = [
+            dict(
+                id='www',
+                name='www.unit.tests.',
+                type='A',
+                ttl=300,
+                records=[dict(content='1.2.3.4')],
+            ),
+            dict(
+                id='other',
+                name='other.unit.tests.',
+                type='A',
+                ttl=300,
+                records=[dict(content='1.2.3.4')],
+            ),
+        ]
+        self._mock_apis(
+            fake_http,
+            zones=[dict(id=self.zone_id, name='unit.tests.')],
+            rrsets=rrsets,
+        )
+        checkpoint = Checkpoint()
+        checkpoint.finish('unit.tests.')
+
+        self.assertEqual(
+            {
+                'unit.tests.': [
+                    'mail.unit.tests. CNAME',
+                    'other.unit.tests. A',
+                    'unit.tests. TXT',
+                    'www.unit.tests. A',
+                ]
+            },
+            self._migration(checkpoint).run(['unit.tests']),
+        )
+
+    @requests_mock.Mocker()
+    def test_main(self, fake_http):
+        self._mock_apis(fake_http)
+        env = dict(SELECTEL_V1_TOKEN='v1-token', SELECTEL_V2_TOKEN='v2-token')
+        with patch.dict('os.environ', env), patch('builtins.print') as out:
+            self.assertEqual(0, main(['--max-workers', '2']))
+            out.assert_not_called()
+
+        mismatches = {'unit.tests.': ['www.unit.tests. A']}
+        with patch.dict('os.environ', env), patch('builtins.print') as out:
+            with patch.object(Migration, 'run', return_value=mismatches) as run:
+                self.assertEqual(1, main(['unit.tests']))
+        run.assert_called_once_with(['unit.tests'])
+        out.assert_called_once_with('unit.tests.: www.unit.tests. A')
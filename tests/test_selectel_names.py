@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from octodns import idna
+from octodns.zone import Zone
+
+from octodns_selectel import names
+
+
+class TestSelectelNames(TestCase):
+    def test_idna(self):
+        for name in (
+            'unit.tests.',
+            'WWW.Unit.Tests.',
+            'xn--dj-kia8a.unit.tests.',
+            'XN--DJ-KIA8A.unit.tests.',
+            'déjà.unit.tests.',
+            'DÉJÀ.unit.tests.',
+            '',
+        ):
+            self.assertEqual(idna.idna_decode(name), names.idna_decode(name))
+
+    def test_interned_and_bounded(self):
+        decoded = names.idna_decode(''.join(['Interned.', 'unit.tests.']))
+        self.assertIs(decoded, names.idna_decode('interned.unit.tests.'))
+        self.assertIs(
+            names.hostname_from_fqdn('www.unit.tests.', 'unit.tests.'),
+            names.hostname_from_fqdn(
+                ''.join(['WWW.', 'unit.tests.']), 'unit.tests.'
+            ),
+        )
+        self.assertEqual(
+            names.CACHE_SIZE, names.idna_decode.cache_info().maxsize
+        )
+
+    def test_hostname_from_fqdn(self):
+        for zone_name in ('unit.tests.', 'déjà.tests.'):
+            zone = Zone(zone_name, [])
+            for fqdn in (
+                zone_name,
+                f'www.{zone_name}',
+                f'WWW.{zone_name.upper()}',
+                f'a.b.{zone_name}',
+                f'www.{zone_name[:-1]}',
+                f'www.{idna.idna_encode(zone_name)}',
+                f'www.{idna.idna_decode(zone_name)}',
+                f'déjà.{zone_name}',
+                'wwwunit.tests.',
+                'other.zone.',
+            ):
+                self.assertEqual(
+                    zone.hostname_from_fqdn(fqdn),
+                    names.hostname_from_fqdn(fqdn, zone.name),
+                    fqdn,
+                )
@@ -0,0 +1,30 @@
+import sys
+from subprocess import run
+from unittest import TestCase
+
+import octodns_selectel
+from octodns_selectel.v1.provider import SelectelProvider as Legacy
+from octodns_selectel.v2.provider import SelectelProvider
+
+
+class TestSelectelPackage(TestCase):
+    def test_lazy_providers(self):
+        self.assertIs(SelectelProvider, octodns_selectel.SelectelProvider)
+        self.assertIs(Legacy, octodns_selectel.SelectelProviderLegacy)
+        self.assertIn('SelectelProvider', dir(octodns_selectel))
+        with self.assertRaises(AttributeError):
+            octodns_selectel.SelectelProviderV3
+
+    def test_import_loads_no_provider(self):
+        code = (
+            'import sys, octodns_selectel; '
+            'print(sorted(m for m in sys.modules if m.startswith('
+            '("octodns_selectel.v1", "octodns_selectel.v2", "requests"))))'
+        )
+        result = run(
+            [sys.executable, '-c', code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual('[]\n', result.stdout)
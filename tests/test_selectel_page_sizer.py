@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from octodns_selectel.metrics import Metrics
+from octodns_selectel.page_sizer import PageSizer
+
+
+class TestSelectelPageSizer(TestCase):
+    def test_fixed(self):
+        sizer = PageSizer(50)
+        self.assertFalse(sizer.adaptive)
+        sizer.observe(50, 0.01)
+        sizer.observe(50, 10)
+        self.assertEqual(50, sizer.size)
+
+    def test_adaptive(self):
+        metrics = Metrics()
+        sizer = PageSizer(
+            100, minimum=10, maximum=1000, metrics=metrics, name='rrsets'
+        )
+        self.assertTrue(sizer.adaptive)
+        self.assertEqual(100, metrics.get('rrsets'))
+
+        # fast full pages grow the size up to the maximum
+        for size in (200, 400, 800, 1000, 1000):
+            sizer.observe(sizer.size, 0.1)
+            self.assertEqual(size, sizer.size)
+        # a short last page or a moderately slow page keep it
+        sizer.observe(10, 0.1)
+        sizer.observe(1000, 0.75)
+        self.assertEqual(1000, sizer.size)
+        # slow pages shrink it in proportion, not below the minimum
+        sizer.observe(1000, 4)
+        self.assertEqual(250, sizer.size)
+        sizer.observe(250, 100)
+        self.assertEqual(10, sizer.size)
+        self.assertEqual(10, metrics.get('rrsets'))
+
+    def test_concurrent_pages(self):
+        sizer = PageSizer(100, minimum=10, maximum=1000)
+        # pages requested with the same size adjust it once
+        for _ in range(3):
+            sizer.observe(100, 0.1, 100)
+        self.assertEqual(200, sizer.size)
+        sizer.observe(100, 2, 100)
+        sizer.observe(100, 0.1, 100)
+        self.assertEqual(50, sizer.size)
+
+    def test_initial_within_bounds(self):
+        self.assertEqual(1000, PageSizer(5000, minimum=1, maximum=1000).size)
+        self.assertEqual(10, PageSizer(1, minimum=10, maximum=1000).size)
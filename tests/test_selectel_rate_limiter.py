@@ -0,0 +1,95 @@
+from importlib import reload
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from octodns.provider import ProviderException
+
+from octodns_selectel import rate_limiter
+from octodns_selectel.rate_limiter import RateLimiter, SharedRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestSelectelRateLimiter(TestCase):
+    def test_burst_then_spaced(self):
+        clock = FakeClock()
+        limiter = RateLimiter(2, burst=2, clock=clock, sleep=clock.sleep)
+
+        for _ in range(4):
+            limiter.acquire()
+
+        self.assertEqual([0.5, 0.5], clock.sleeps)
+
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        limiter = RateLimiter(10, clock=clock, sleep=clock.sleep)
+        self.assertEqual(10, limiter.burst)
+
+        for _ in range(10):
+            limiter.acquire()
+        clock.now += 0.5
+        for _ in range(5):
+            limiter.acquire()
+
+        self.assertEqual([], clock.sleeps)
+
+    def test_slow_rate(self):
+        clock = FakeClock()
+        limiter = RateLimiter(0.5, clock=clock, sleep=clock.sleep)
+        self.assertEqual(1, limiter.burst)
+
+        limiter.acquire()
+        limiter.acquire()
+
+        self.assertEqual([2.0], clock.sleeps)
+
+
+class TestSelectelSharedRateLimiter(TestCase):
+    def test_processes_share_the_bucket(self):
+        clock = FakeClock()
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'selectel.bucket')
+            # one limiter per process, all using the same file
+            limiters = [
+                SharedRateLimiter(
+                    path, 2, burst=2, clock=clock, sleep=clock.sleep
+                )
+                for _ in range(2)
+            ]
+
+            for limiter in limiters * 2:
+                limiter.acquire()
+            self.assertEqual([0.5, 0.5], clock.sleeps)
+
+            # refilled after a while, the bucket never exceeds its burst
+            clock.now += 10
+            for limiter in limiters:
+                limiter.acquire()
+            self.assertEqual([0.5, 0.5], clock.sleeps)
+
+            # a clock jumping backwards adds no tokens
+            clock.now -= 100
+            limiters[0].acquire()
+            self.assertEqual([0.5, 0.5, 0.5], clock.sleeps)
+
+    def test_without_fcntl(self):
+        try:
+            with patch.dict('sys.modules', fcntl=None):
+                reload(rate_limiter)
+            with self.assertRaises(ProviderException):
+                rate_limiter.SharedRateLimiter('selectel.bucket', 10)
+        finally:
+            reload(rate_limiter)
@@ -1,4 +1,7 @@
+from os.path import exists, join
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
 import requests_mock
 from requests.exceptions import HTTPError
@@ -6,7 +9,11 @@ from requests.exceptions import HTTPError
 from octodns.record import Record, Update
 from octodns.zone import Zone
 
-from octodns_selectel.v1.provider import SelectelProvider
+from octodns_selectel.rate_limiter import SharedRateLimiter
+from octodns_selectel.v1.provider import (
+    SelectelCreateRecordsFailed,
+    SelectelProvider,
+)
 
 
 class TestSelectelProvider(TestCase):
@@ -416,6 +423,21 @@ class TestSelectelProvider(TestCase):
         result = provider.domain_list()
         self.assertEqual(result, expected)
 
+    @requests_mock.Mocker()
+    def test_shared_rate_limit(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.head(
+            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
+        )
+
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'selectel.bucket')
+            provider = SelectelProvider(
+                123, 'test_token', rate_limit=10, rate_limit_file=path
+            )
+            self.assertIsInstance(provider._rate_limiter, SharedRateLimiter)
+            self.assertTrue(exists(path))
+
     @requests_mock.Mocker()
     def test_list_zones(self, fake_http):
         fake_http.get(f'{self.API_URL}/', json=self.domain)
@@ -429,6 +451,38 @@ class TestSelectelProvider(TestCase):
         result = provider.list_zones()
         self.assertEqual(result, expected)
 
+        # the listing made by __init__ is reused
+        self.assertEqual(expected, provider.list_zones())
+        self.assertEqual(2, fake_http.call_count)
+
+    @requests_mock.Mocker()
+    def test_list_zones_ttl(self, fake_http):
+        listing = fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.head(
+            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
+        )
+        fake_http.post(
+            f'{self.API_URL}/', json=dict(name='other.tests', id=100001)
+        )
+
+        with patch('octodns_selectel.v1.provider.monotonic') as monotonic:
+            monotonic.return_value = 100
+            provider = SelectelProvider(123, 'test_token', domain_list_ttl=60)
+            monotonic.return_value = 159
+            self.assertEqual(['unit.tests.'], provider.list_zones())
+            self.assertEqual(1, listing.call_count)
+
+            # created domains are added to the cached listing
+            provider.create_domain('other.tests')
+            self.assertEqual(
+                ['unit.tests.', 'other.tests.'], provider.list_zones()
+            )
+            self.assertEqual(1, listing.call_count)
+
+            monotonic.return_value = 160
+            self.assertEqual(['unit.tests.'], provider.list_zones())
+            self.assertEqual(2, listing.call_count)
+
     @requests_mock.Mocker()
     def test_authentication_fail(self, fake_http):
         fake_http.get(f'{self.API_URL}/', status_code=401)
@@ -483,8 +537,7 @@ class TestSelectelProvider(TestCase):
             f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
         )
         fake_http.head(
-            f'{self.API_URL}/unit.tests/records/',
-            headers={'X-Total-Count': '0'},
+            f'{self.API_URL}/100000/records/', headers={'X-Total-Count': '0'}
         )
 
         provider = SelectelProvider(123, 'test_token')
@@ -571,10 +624,444 @@ class TestSelectelProvider(TestCase):
             f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
         )
         fake_http.head(
-            f'{self.API_URL}/unit.tests/records/',
-            headers={'X-Total-Count': '1'},
+            f'{self.API_URL}/100000/records/', headers={'X-Total-Count': '1'}
         )
         fake_http.delete(f'{self.API_URL}/100000/records/1', exc=HTTPError)
         provider = SelectelProvider(123, 'test_token')
 
         provider.delete_record('unit.tests', 'NS', None)
+
+    @requests_mock.Mocker()
+    def test_request_with_pagination(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.head(
+            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
+        )
+        records = [dict(id=i, type='A', name='unit.tests') for i in range(7)]
+        for offset in range(0, len(records), 3):
+            fake_http.get(
+                f'{self.API_URL}/100000/records/?limit=3&offset={offset}',
+                json=records[offset : offset + 3],
+            )
+
+        provider = SelectelProvider(123, 'test_token', page_size=3)
+        result = provider._request_with_pagination(
+            '/100000/records/', len(records)
+        )
+
+        self.assertEqual(records, result)
+        self.assertEqual(
+            ['0', '3', '6'],
+            sorted(
+                r.qs['offset'][0]
+                for r in fake_http.request_history
+                if r.path == '/domains/v1/100000/records/'
+            ),
+        )
+        self.assertEqual([], provider._request_with_pagination('/', 0))
+
+    @requests_mock.Mocker()
+    def test_adaptive_page_size(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.head(
+            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
+        )
+        records = [dict(id=i, type='A', name='unit.tests') for i in range(7)]
+
+        def page(request, context):
+            offset = int(request.qs['offset'][0])
+            return records[offset : offset + int(request.qs['limit'][0])]
+
+        fake_http.get(f'{self.API_URL}/100000/records/', json=page)
+
+        provider = SelectelProvider(
+            123, 'test_token', page_size=2, adaptive_page_size=True
+        )
+        self.assertEqual(2, provider.metrics.get('domains.page_size'))
+
+        def listing():
+            start = len(fake_http.request_history)
+            result = provider._request_with_pagination(
+                '/100000/records/', len(records)
+            )
+            self.assertEqual(records, result)
+            return sorted(
+                (int(r.qs['offset'][0]), int(r.qs['limit'][0]))
+                for r in fake_http.request_history[start:]
+            )
+
+        # sizes adapt between listings, the pages of one listing share one
+        self.assertEqual([(0, 2), (2, 2), (4, 2), (6, 2)], listing())
+        self.assertEqual(4, provider.metrics.get('records.page_size'))
+        self.assertEqual([(0, 4), (4, 4)], listing())
+        self.assertEqual(8, provider.metrics.get('records.page_size'))
+        self.assertEqual([(0, 8)], listing())
+        self.assertEqual(8, provider.metrics.get('records.page_size'))
+
+    @requests_mock.Mocker()
+    def test_delete_record_uses_paginated_index(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.head(
+            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
+        )
+        records = [
+            dict(id=1, type='A', name='unit.tests'),
+            dict(id=2, type='TXT', name='unit.tests'),
+            dict(id=3, type='A', name='www.unit.tests.'),
+        ]
+        fake_http.head(
+            f'{self.API_URL}/100000/records/',
+            headers={'X-Total-Count': str(len(records))},
+        )
+        for offset in range(0, len(records), 2):
+            fake_http.get(
+                f'{self.API_URL}/100000/records/?limit=2&offset={offset}',
+                json=records[offset : offset + 2],
+            )
+        fake_http.post(
+            f'{self.API_URL}/100000/records/',
+            json=dict(id=4, type='A', name='www.unit.tests.'),
+        )
+        deleted = fake_http.delete(f'{self.API_URL}/100000/records/3', text='')
+        fake_http.delete(f'{self.API_URL}/100000/records/4', exc=HTTPError)
+
+        provider = SelectelProvider(123, 'test_token', page_size=2)
+        provider.create_record(
+            'unit.tests', dict(type='A', name='www.unit.tests.')
+        )
+        self.assertFalse(deleted.called)
+
+        index = provider._records_index('unit.tests')
+        provider.create_record(
+            'unit.tests', dict(type='A', name='www.unit.tests.')
+        )
+        self.assertEqual(
+            [3, 4], [r['id'] for r in index[('www.unit.tests', 'A')]]
+        )
+
+        with self.assertLogs(provider.log, 'WARNING'):
+            provider.delete_record('unit.tests', 'A', 'www')
+        self.assertTrue(deleted.called)
+        self.assertEqual([4], [r['id'] for r in index[('www.unit.tests', 'A')]])
+        self.assertEqual([1], [r['id'] for r in index[('unit.tests', 'A')]])
+
+    def _mock_update_api(self, fake_http, records):
+        fake_http.get(f'{self.API_URL}/', json=self.domain)
+        fake_http.head(
+            f'{self.API_URL}/', headers={'X-Total-Count': str(len(self.domain))}
+        )
+        fake_http.get(f'{self.API_URL}/unit.tests/records/', json=records)
+        fake_http.head(
+            f'{self.API_URL}/unit.tests/records/',
+            headers={'X-Total-Count': str(len(records))},
+        )
+        fake_http.post(f'{self.API_URL}/100000/records/', json=dict(id=10))
+        for record in records:
+            fake_http.delete(
+                f'{self.API_URL}/100000/records/{record["id"]}', text=''
+            )
+            fake_http.put(
+                f'{self.API_URL}/100000/records/{record["id"]}', json=record
+            )
+
+    def _apply_records(self, provider, *records):
+        zone = Zone('unit.tests.', [])
+        for name, data in records:
+            zone.add_record(Record.new(zone, name, data))
+        provider.apply(provider.plan(zone))
+
+    def _calls(self, fake_http):
+        return [
+            (r.method, r.path.rsplit('/', 1)[-1])
+            for r in fake_http.request_history
+            if r.method in ('POST', 'PUT', 'DELETE')
+        ]
+
+    @requests_mock.Mocker()
+    def test_apply_update_changes_only_differing_values(self, fake_http):
+        records = [
+            dict(id=1, type='A', ttl=300, content='1.1.1.1', name='unit.tests'),
+            dict(id=2, type='A', ttl=300, content='2.2.2.2', name='unit.tests'),
+            dict(id=3, type='A', ttl=300, content='3.3.3.3', name='unit.tests'),
+        ]
+        self._mock_update_api(fake_http, records)
+        provider = SelectelProvider(123, 'test_token')
+
+        self._apply_records(
+            provider,
+            ('', dict(type='A', ttl=300, values=['1.1.1.1', '4.4.4.4'])),
+        )
+
+        self.assertEqual(
+            [('POST', ''), ('DELETE', '2'), ('DELETE', '3')],
+            self._calls(fake_http),
+        )
+        self.assertEqual(
+            ['4.4.4.4'],
+            [
+                r.json()['content']
+                for r in fake_http.request_history
+                if r.method == 'POST'
+            ],
+        )
+        self.assertEqual(
+            [1, 10],
+            [
+                r['id']
+                for r in provider._records_index('unit.tests')[
+                    ('unit.tests', 'A')
+                ]
+            ],
+        )
+
+    @requests_mock.Mocker()
+    def test_apply_update_ttl_only(self, fake_http):
+        records = [
+            dict(
+                id=1,
+                type='MX',
+                ttl=300,
+                content='mx.unit.tests',
+                priority=10,
+                name='unit.tests',
+            ),
+            dict(
+                id=2,
+                type='MX',
+                ttl=300,
+                content='mx2.unit.tests',
+                priority=20,
+                name='unit.tests',
+            ),
+        ]
+        self._mock_update_api(fake_http, records)
+        fake_http.put(f'{self.API_URL}/100000/records/2', exc=HTTPError)
+        provider = SelectelProvider(123, 'test_token')
+
+        with self.assertLogs(provider.log, 'WARNING'):
+            self._apply_records(
+                provider,
+                (
+                    '',
+                    dict(
+                        type='MX',
+                        ttl=600,
+                        values=[
+                            dict(preference=10, exchange='mx.unit.tests.'),
+                            dict(preference=20, exchange='mx2.unit.tests.'),
+                        ],
+                    ),
+                ),
+            )
+
+        self.assertEqual(
+            [('PUT', '1'), ('PUT', '2'), ('POST', ''), ('DELETE', '2')],
+            self._calls(fake_http),
+        )
+        index = provider._records_index('unit.tests')
+        self.assertEqual(
+            [(1, 600), (10, None)],
+            [(r['id'], r.get('ttl')) for r in index[('unit.tests', 'MX')]],
+        )
+
+    @requests_mock.Mocker()
+    def test_apply_update_single_value_deletes_first(self, fake_http):
+        records = [
+            dict(
+                id=1,
+                type='CNAME',
+                ttl=300,
+                content='a.unit.tests',
+                name='www.unit.tests',
+            )
+        ]
+        self._mock_update_api(fake_http, records)
+        provider = SelectelProvider(123, 'test_token')
+
+        self._apply_records(
+            provider,
+            ('www', dict(type='CNAME', ttl=300, value='b.unit.tests.')),
+        )
+
+        self.assertEqual(
+            [('DELETE', '1'), ('POST', '')], self._calls(fake_http)
+        )
+
+    @requests_mock.Mocker()
+    def test_apply_create_concurrent_values(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=[])
+        fake_http.head(f'{self.API_URL}/', headers={'X-Total-Count': '0'})
+        fake_http.head(
+            f'{self.API_URL}/unit.tests/records/',
+            headers={'X-Total-Count': '0'},
+        )
+        fake_http.post(
+            f'{self.API_URL}/', json=dict(name='unit.tests', id=100000)
+        )
+        values = [f'10.0.0.{i}' for i in range(5)]
+
+        def create(request, context):
+            if request.json()['content'] == values[3]:
+                context.status_code = 500
+                return {}
+            return dict(request.json(), id=request.json()['content'])
+
+        fake_http.post(f'{self.API_URL}/100000/records/', json=create)
+
+        provider = SelectelProvider(
+            123, 'test_token', max_workers=3, rate_limit=100
+        )
+        zone = Zone('unit.tests.', [])
+        zone.add_record(
+            Record.new(zone, '', dict(type='A', ttl=300, values=values))
+        )
+        # ALIAS cannot be imported as a zone file
+        zone.add_record(
+            Record.new(zone, '', dict(type='ALIAS', ttl=300, value='a.tests.'))
+        )
+        # single-value records share the pool with the values above
+        targets = [f'host-{i}.tests.' for i in range(3)]
+        for i, target in enumerate(targets):
+            zone.add_record(
+                Record.new(
+                    zone, f'c-{i}', dict(type='CNAME', ttl=300, value=target)
+                )
+            )
+        plan = provider.plan(zone)
+
+        with self.assertLogs(provider.log, 'WARNING') as logs:
+            with self.assertRaises(SelectelCreateRecordsFailed) as ctx:
+                provider.apply(plan)
+        self.assertEqual(1, len(logs.output))
+        self.assertIn(values[3], logs.output[0])
+        self.assertEqual(
+            ['unit.tests. A 10.0.0.3'], [v for v, _ in ctx.exception.failures]
+        )
+        self.assertTrue(
+            str(ctx.exception).startswith(
+                'Failed to create 1 of 9 records in unit.tests: '
+                'unit.tests. A 10.0.0.3: '
+            )
+        )
+        posts = [
+            r.json()['content']
+            for r in fake_http.request_history
+            if r.path == '/domains/v1/100000/records/'
+        ]
+        self.assertEqual(sorted(values + targets + ['a.tests.']), sorted(posts))
+        # the domain was created once, before the values
+        self.assertEqual(
+            1,
+            len(
+                [
+                    r
+                    for r in fake_http.request_history
+                    if r.method == 'POST' and r.path == '/domains/v1/'
+                ]
+            ),
+        )
+
+    @requests_mock.Mocker()
+    def test_apply_imports_new_domain(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=[])
+        fake_http.head(f'{self.API_URL}/', headers={'X-Total-Count': '0'})
+        fake_http.head(
+            f'{self.API_URL}/unit.tests/records/',
+            headers={'X-Total-Count': '0'},
+        )
+        created = fake_http.post(
+            f'{self.API_URL}/', json=dict(name='unit.tests', id=100000)
+        )
+        records = fake_http.post(f'{self.API_URL}/100000/records/')
+
+        provider = SelectelProvider(123, 'test_token')
+        zone = Zone('unit.tests.', [])
+        for name, data in (
+            ('', dict(type='A', ttl=100, values=['1.2.3.4', '5.6.7.8'])),
+            (
+                '',
+                dict(
+                    type='MX',
+                    ttl=400,
+                    value=dict(preference=10, exchange='mx.unit.tests.'),
+                ),
+            ),
+            ('sub', dict(type='NS', ttl=600, value='ns1.unit.tests.')),
+            ('www', dict(type='CNAME', ttl=300, value='unit.tests.')),
+            (
+                '_srv._tcp',
+                dict(
+                    type='SRV',
+                    ttl=800,
+                    value=dict(
+                        priority=10,
+                        weight=20,
+                        port=30,
+                        target='foo.unit.tests.',
+                    ),
+                ),
+            ),
+            (
+                'sshfp',
+                dict(
+                    type='SSHFP',
+                    ttl=800,
+                    value=dict(
+                        algorithm=1, fingerprint_type=1, fingerprint='abcdef'
+                    ),
+                ),
+            ),
+            ('txt', dict(type='TXT', ttl=10, value='v=DKIM1\\; ' + 'x' * 300)),
+        ):
+            zone.add_record(Record.new(zone, name, data))
+
+        self.assertEqual(7, provider.apply(provider.plan(zone)))
+        self.assertEqual(1, created.call_count)
+        self.assertFalse(records.called)
+        self.assertEqual(100000, provider._domain_list['unit.tests']['id'])
+
+        self.assertEqual(
+            [
+                '$ORIGIN unit.tests.',
+                '@ 100 IN A 1.2.3.4',
+                '@ 100 IN A 5.6.7.8',
+                '@ 400 IN MX 10 mx.unit.tests.',
+                '_srv._tcp 800 IN SRV 10 20 30 foo.unit.tests.',
+                'sshfp 800 IN SSHFP 1 1 abcdef',
+                'sub 600 IN NS ns1.unit.tests.',
+                'txt 60 IN TXT "v=DKIM1\\; '
+                + 'x' * 245
+                + '" "'
+                + 'x' * 55
+                + '"',
+                'www 300 IN CNAME unit.tests.',
+            ],
+            sorted(created.last_request.json()['bind_zone'].splitlines()),
+        )
+
+    @requests_mock.Mocker()
+    def test_apply_new_domain_with_alias(self, fake_http):
+        fake_http.get(f'{self.API_URL}/', json=[])
+        fake_http.head(f'{self.API_URL}/', headers={'X-Total-Count': '0'})
+        fake_http.head(
+            f'{self.API_URL}/unit.tests/records/',
+            headers={'X-Total-Count': '0'},
+        )
+        created = fake_http.post(
+            f'{self.API_URL}/', json=dict(name='unit.tests', id=100000)
+        )
+        records = fake_http.post(
+            f'{self.API_URL}/100000/records/', json=dict(id=1)
+        )
+
+        provider = SelectelProvider(123, 'test_token')
+        zone = Zone('unit.tests.', [])
+        zone.add_record(
+            Record.new(zone, '', dict(type='ALIAS', ttl=300, value='a.tests.'))
+        )
+
+        self.assertEqual(1, provider.apply(provider.plan(zone)))
+        self.assertEqual('', created.last_request.json()['bind_zone'])
+        self.assertEqual(
+            ['a.tests.'], [r.json()['content'] for r in records.request_history]
+        )
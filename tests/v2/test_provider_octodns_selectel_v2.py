@@ -1,14 +1,24 @@
 import uuid
+from os.path import exists, join
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 import requests_mock
 
-from octodns.record import Record, Update
+from octodns.provider.plan import Plan
+from octodns.record import Create, Delete, Record, Update
 from octodns.zone import Zone
 
+from octodns_selectel.rate_limiter import RateLimiter, SharedRateLimiter
 from octodns_selectel.v2.dns_client import DNSClient
-from octodns_selectel.v2.mappings import to_octodns_record_data
+from octodns_selectel.v2.exceptions import ApiException, SelectelException
+from octodns_selectel.v2.mappings import (
+    canonical_record,
+    to_octodns_record_data,
+)
 from octodns_selectel.v2.provider import SelectelProvider
+from octodns_selectel.v2.transport import MemoryTransport
+from octodns_selectel.v2.validation import SelectelValidationFailed
 
 
 class TestSelectelProvider(TestCase):
@@ -418,6 +428,99 @@ class TestSelectelProvider(TestCase):
 
         self.assertEqual(1, apply_len)
 
+    @requests_mock.Mocker()
+    def test_apply_with_cold_cache(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        a_rrset = self._a_rrset('a-id', 'sub')
+        single = fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset'
+            f'?rrset_types=A&name=sub.{self._zone_name}',
+            json=dict(result=[a_rrset], limit=1, next_offset=0),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset'
+            f'?rrset_types=TXT&name=txt.{self._zone_name}',
+            json=dict(result=[], limit=0, next_offset=0),
+        )
+        updated = fake_http.patch(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset/a-id',
+            status_code=204,
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+
+        desired = Zone(self._zone_name, [])
+        existing = Record.new(desired, 'sub', to_octodns_record_data(a_rrset))
+        new = existing.copy()
+        new.ttl *= 2
+        desired.add_record(new)
+        plan = Plan(None, desired, [Update(existing, new)], True)
+
+        # only the rrset being updated is fetched, not the whole zone
+        self.assertEqual(1, provider.apply(plan))
+        self.assertEqual(1, single.call_count)
+        self.assertEqual(7200, updated.last_request.json()['ttl'])
+        self.assertEqual(3, fake_http.call_count)
+
+        missing = Record.new(
+            desired, 'txt', dict(type='TXT', ttl=300, value='missing')
+        )
+        plan = Plan(None, desired, [Delete(missing)], True)
+        with self.assertRaises(SelectelException) as ctx:
+            provider.apply(plan)
+        self.assertEqual(
+            f'rrset txt.{self._zone_name} TXT not found in {self._zone_name}',
+            str(ctx.exception),
+        )
+
+    @requests_mock.Mocker()
+    def test_apply_validates_before_changes(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(result=[], limit=0, next_offset=0),
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        desired = Zone(self._zone_name, [])
+        desired.add_record(
+            Record.new(desired, 'a', dict(type='A', ttl=30, value='1.2.3.4'))
+        )
+        desired.add_record(
+            Record.new(
+                desired,
+                'www',
+                dict(type='CNAME', ttl=300, value='a.unit.tests.'),
+                lenient=True,
+            ),
+            lenient=True,
+        )
+        desired.add_record(
+            Record.new(
+                desired, 'www', dict(type='A', ttl=300, value='1.2.3.4')
+            ),
+            lenient=True,
+        )
+        plan = Plan(
+            None, desired, [Create(record) for record in desired.records], True
+        )
+
+        with self.assertRaises(SelectelValidationFailed) as ctx:
+            provider.apply(plan)
+        self.assertEqual(
+            [
+                'a.unit.tests. A: ttl 30 below 60',
+                'www.unit.tests. CNAME: other data at the same name (A)',
+            ],
+            ctx.exception.problems,
+        )
+        # nothing was sent, not even the zone creation
+        self.assertEqual(1, fake_http.call_count)
+
     @requests_mock.Mocker()
     def test_apply_update_ttl_internal_error(self, fake_http):
         fake_http.get(
@@ -627,6 +730,7 @@ class TestSelectelProvider(TestCase):
         include_change = provider._include_change(change)
 
         self.assertFalse(include_change)
+        self.assertEqual(fingerprint1.upper(), new_record.values[0].fingerprint)
 
     @requests_mock.Mocker()
     def test_include_change_returns_true(self, fake_http):
@@ -651,6 +755,585 @@ class TestSelectelProvider(TestCase):
 
         self.assertTrue(include_change)
 
+    @requests_mock.Mocker()
+    def test_include_change_clamps_ttl(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+
+        provider = SelectelProvider(self._version, self._openstack_token)
+        zone = Zone(self._zone_name, [])
+
+        exist_record = Record.new(
+            zone, '', dict(ttl=60, type="A", values=["1.2.3.4"])
+        )
+        new = Record.new(zone, '', dict(ttl=30, type="A", values=["1.2.3.4"]))
+        include_change = provider._include_change(Update(exist_record, new))
+
+        self.assertFalse(include_change)
+        self.assertEqual(30, new.ttl)
+
+    @requests_mock.Mocker()
+    def test_populate_target_caches_fingerprints(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/'
+            f'rrset?limit={DNSClient._PAGINATION_LIMIT}&offset=0',
+            json=dict(
+                result=self.rrsets, limit=len(self.rrsets), next_offset=0
+            ),
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+
+        provider.populate(Zone(self._zone_name, []))
+        self.assertEqual({}, provider._fingerprints)
+
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone, target=True)
+        fingerprints = provider._fingerprints[self._zone_name]
+        self.assertEqual(len(self.rrsets), len(fingerprints))
+
+        existing = next(r for r in zone.records if r._type == 'A')
+        cached = fingerprints[id(existing)]
+        self.assertIs(existing, cached[0])
+        self.assertEqual(cached[1], provider._record_fingerprint(existing))
+
+        # planning drops the fingerprints of the zone again
+        self.assertIsNone(provider.plan(zone))
+        self.assertEqual({}, provider._fingerprints)
+
+    @requests_mock.Mocker()
+    def test_include_change_hash_collision(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(result=[], limit=0, next_offset=0),
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        zone = Zone(self._zone_name, [])
+        existing, new = (
+            Record.new(zone, 'a', dict(type='A', ttl=3600, value=value))
+            for value in ('1.2.3.4', '5.6.7.8')
+        )
+        # both records claim the same hash, the canonical form tells them apart
+        provider._fingerprints[self._zone_name] = {
+            id(record): (record, (1, canonical_record(record)))
+            for record in (existing, new)
+        }
+        self.assertTrue(provider._include_change(Update(existing, new)))
+
+    def _every_type_rrsets(self):
+        contents = dict(
+            A=('', ['1.2.3.4', '5.6.7.8']),
+            AAAA=('', ['::1']),
+            ALIAS=('', ['alias.unit.tests.']),
+            CAA=('', ['0 issue "ca.unit.tests"', '0 iodef "mailto:a@b.c"']),
+            CNAME=('www', ['unit.tests.']),
+            DNAME=('dname', ['unit.tests.']),
+            MX=('', ['10 mx1.unit.tests.', '20 mx2.unit.tests.']),
+            NS=('sub', ['ns1.unit.tests.', 'ns2.unit.tests.']),
+            SRV=('_sip._tcp', ['10 20 5060 sip.unit.tests.']),
+            SSHFP=('', ['1 1 123456789abcdef0']),
+            TXT=('', ['"v=spf1 -all"', '"other"']),
+        )
+        self.assertEqual(SelectelProvider.SUPPORTS, set(contents))
+        return [
+            dict(
+                name=f'{name}.{self._zone_name}' if name else self._zone_name,
+                type=_type,
+                ttl=self._ttl,
+                records=[dict(content=content) for content in values],
+            )
+            for _type, (name, values) in contents.items()
+        ]
+
+    def test_populate_target_every_type(self):
+        transport = MemoryTransport(
+            {self._zone_name: self._every_type_rrsets()}
+        )
+        provider = SelectelProvider('test', 'token', transport=transport)
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone, target=True)
+        self.assertEqual(
+            SelectelProvider.SUPPORTS, {record._type for record in zone.records}
+        )
+        fingerprints = provider._fingerprints[self._zone_name]
+        self.assertEqual(len(zone.records), len(fingerprints))
+
+        # an identical zone plans nothing
+        desired = Zone(self._zone_name, [])
+        for record in zone.records:
+            desired.add_record(record.copy(desired))
+        self.assertIsNone(provider.plan(desired))
+
+    def test_include_change_every_type(self):
+        transport = MemoryTransport(
+            {self._zone_name: self._every_type_rrsets()}
+        )
+        provider = SelectelProvider('test', 'token', transport=transport)
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone)
+        for existing in zone.records:
+            with self.subTest(existing._type):
+                same = existing.copy()
+                self.assertFalse(
+                    provider._include_change(Update(existing, same))
+                )
+                data = dict(
+                    existing.data, type=existing._type, ttl=existing.ttl + 1
+                )
+                changed = Record.new(zone, existing.name, data)
+                self.assertTrue(
+                    provider._include_change(Update(existing, changed))
+                )
+
+    def _soa_rrset(self, serial):
+        return dict(
+            id=str(uuid.uuid4()),
+            name=self._zone_name,
+            ttl=self._ttl,
+            type="SOA",
+            records=[
+                dict(
+                    content="a.ns.selectel.ru. support.selectel.ru. "
+                    f"{serial} 10800 3600 604800 60"
+                )
+            ],
+        )
+
+    def _mock_snapshot_api(self, fake_http, serial):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        rrsets = fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/'
+            f'rrset?limit={DNSClient._PAGINATION_LIMIT}&offset=0',
+            json=dict(
+                result=self.rrsets + [self._soa_rrset(serial)],
+                limit=len(self.rrsets) + 1,
+                next_offset=0,
+            ),
+        )
+        soa = fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset?rrset_types=SOA',
+            json=dict(result=[self._soa_rrset(serial)], limit=1, next_offset=0),
+        )
+        return rrsets, soa
+
+    def _desired_zone(self):
+        zone = Zone(self._zone_name, [])
+        for record in self.expected_records:
+            zone.add_record(record)
+        return zone
+
+    def test_plan_with_snapshot_skips_unchanged_zone(self):
+        with TemporaryDirectory() as tmp:
+            snapshot_file = join(tmp, 'snapshots.json')
+            with requests_mock.Mocker() as fake_http:
+                rrsets, soa = self._mock_snapshot_api(fake_http, 1)
+                provider = SelectelProvider(
+                    self._version,
+                    self._openstack_token,
+                    snapshot_file=snapshot_file,
+                )
+                self.assertIsNone(provider.plan(self._desired_zone()))
+                self.assertEqual(1, rrsets.call_count)
+                self.assertEqual(1, soa.call_count)
+                provider.flush_snapshots()
+
+            with requests_mock.Mocker() as fake_http:
+                rrsets, soa = self._mock_snapshot_api(fake_http, 1)
+                provider = SelectelProvider(
+                    self._version,
+                    self._openstack_token,
+                    snapshot_file=snapshot_file,
+                )
+                self.assertIsNone(provider.plan(self._desired_zone()))
+                self.assertEqual(0, rrsets.call_count)
+                self.assertEqual(1, soa.call_count)
+
+            with requests_mock.Mocker() as fake_http:
+                rrsets, soa = self._mock_snapshot_api(fake_http, 2)
+                provider = SelectelProvider(
+                    self._version,
+                    self._openstack_token,
+                    snapshot_file=snapshot_file,
+                )
+                self.assertIsNone(provider.plan(self._desired_zone()))
+                self.assertEqual(1, rrsets.call_count)
+                provider.flush_snapshots()
+
+    @requests_mock.Mocker()
+    def test_plan_with_snapshot_discards_changed_zone(self, fake_http):
+        rrsets, soa = self._mock_snapshot_api(fake_http, 1)
+        with TemporaryDirectory() as tmp:
+            provider = SelectelProvider(
+                self._version,
+                self._openstack_token,
+                snapshot_file=join(tmp, 'snapshots.json'),
+            )
+            self.assertIsNone(provider.plan(self._desired_zone()))
+
+            desired = self._desired_zone()
+            desired.add_record(
+                Record.new(
+                    desired,
+                    'new',
+                    dict(ttl=self._ttl, type='A', value='1.1.1.1'),
+                )
+            )
+            self.assertEqual(1, len(provider.plan(desired).changes))
+            self.assertNotIn(self._zone_name, provider._snapshots._snapshots)
+
+            # the cached listing is still at the current serial
+            self.assertIsNone(provider.plan(self._desired_zone()))
+            self.assertEqual(1, rrsets.call_count)
+            self.assertEqual(3, soa.call_count)
+            provider.flush_snapshots()
+        # without snapshot_file there is nothing to write
+        SelectelProvider(self._version, self._openstack_token).flush_snapshots()
+
+    @requests_mock.Mocker()
+    def test_plan_with_in_memory_snapshots(self, fake_http):
+        rrsets, soa = self._mock_snapshot_api(fake_http, 1)
+        provider = SelectelProvider(
+            self._version, self._openstack_token, in_memory_snapshots=True
+        )
+        self.assertIsNone(provider._snapshots.path)
+        self.assertIsNone(provider.plan(self._desired_zone()))
+        self.assertIsNone(provider.plan(self._desired_zone()))
+        self.assertEqual(1, rrsets.call_count)
+        provider.flush_snapshots()
+
+        # snapshot_file wins over in_memory_snapshots
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, 'snapshots.json')
+            provider = SelectelProvider(
+                self._version,
+                self._openstack_token,
+                snapshot_file=path,
+                in_memory_snapshots=True,
+            )
+            self.assertEqual(path, provider._snapshots.path)
+
+    def test_repeated_source_populate_sees_remote_changes(self):
+        transport = MemoryTransport({self._zone_name: [self._a_rrset(1, 'a')]})
+        provider = SelectelProvider(
+            'test', 'token', transport=transport, in_memory_snapshots=True
+        )
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone)
+        self.assertEqual(['a'], [record.name for record in zone.records])
+
+        # a long-running process populating the zone again sees new rrsets
+        zone_id = provider._get_zone_id_by_name(self._zone_name)
+        transport.request(
+            'POST',
+            f'{DNSClient.API_URL}/zones/{zone_id}/rrset',
+            json=self._a_rrset(2, 'b'),
+        )
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone)
+        self.assertEqual(
+            ['a', 'b'], sorted(record.name for record in zone.records)
+        )
+
+    def _mock_prefetch_api(self, fake_http):
+        other_zone_id = str(uuid.uuid4())
+        broken_zone_id = str(uuid.uuid4())
+        zones = self.selectel_zones + [
+            dict(id=other_zone_id, name='other.tests.'),
+            dict(id=broken_zone_id, name='broken.tests.'),
+        ]
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(result=zones, limit=len(zones), next_offset=0),
+        )
+        listings = [
+            fake_http.get(
+                f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset',
+                json=dict(
+                    result=self.rrsets, limit=len(self.rrsets), next_offset=0
+                ),
+            ),
+            fake_http.get(
+                f'{DNSClient.API_URL}/zones/{other_zone_id}/rrset',
+                json=dict(result=[], limit=0, next_offset=0),
+            ),
+        ]
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{broken_zone_id}/rrset', status_code=500
+        )
+        return listings
+
+    @requests_mock.Mocker()
+    def test_prefetch(self, fake_http):
+        listings = self._mock_prefetch_api(fake_http)
+        provider = SelectelProvider(self._version, self._openstack_token)
+
+        with self.assertLogs(provider.log, 'WARNING') as logs:
+            provider.prefetch(
+                [self._zone_name, 'other.tests.', 'broken.tests.', 'no.tests.']
+            )
+        self.assertIn('broken.tests.', logs.output[0])
+        self.assertEqual([1, 1], [listing.call_count for listing in listings])
+
+        # listings waiting for populate are not downloaded again
+        provider.prefetch([self._zone_name])
+        self.assertEqual([1, 1], [listing.call_count for listing in listings])
+
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone)
+        self.assertEqual(self.expected_records, zone.records)
+        provider.populate(Zone('other.tests.', []))
+        self.assertEqual([1, 1], [listing.call_count for listing in listings])
+
+        # a prefetched listing is served once, afterwards the zone is listed
+        # again to pick up remote changes
+        provider.populate(Zone(self._zone_name, []))
+        self.assertEqual([2, 1], [listing.call_count for listing in listings])
+
+    @requests_mock.Mocker()
+    def test_populate_with_prefetch_option(self, fake_http):
+        listings = self._mock_prefetch_api(fake_http)
+        provider = SelectelProvider(
+            self._version,
+            self._openstack_token,
+            prefetch=[self._zone_name, 'other.tests.', 'broken.tests.'],
+            max_workers=2,
+        )
+
+        with self.assertLogs(provider.log, 'WARNING'):
+            provider.populate(Zone('other.tests.', []))
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone)
+
+        self.assertEqual(self.expected_records, zone.records)
+        self.assertEqual([1, 1], [listing.call_count for listing in listings])
+
+        # the zones have to be listed, not the whole account
+        with self.assertRaises(SelectelException):
+            SelectelProvider(
+                self._version, self._openstack_token, prefetch=True
+            )
+
+    @requests_mock.Mocker()
+    def test_prefetch_with_snapshot(self, fake_http):
+        rrsets, _ = self._mock_snapshot_api(fake_http, 1)
+        provider = SelectelProvider(
+            self._version,
+            self._openstack_token,
+            in_memory_snapshots=True,
+            prefetch=[self._zone_name],
+        )
+        # the prefetched listing is still current, the plan reuses it
+        self.assertIsNone(provider.plan(self._desired_zone()))
+        self.assertEqual(1, rrsets.call_count)
+        self.assertIsNone(provider.plan(self._desired_zone()))
+        self.assertEqual(1, rrsets.call_count)
+
+        # the snapshot holds no SOA, a source populate lists the zone again
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone)
+        self.assertEqual(self.expected_records, zone.records)
+        self.assertEqual(2, rrsets.call_count)
+
+    @requests_mock.Mocker()
+    def test_populate_with_prefetch_zone_names(self, fake_http):
+        listings = self._mock_prefetch_api(fake_http)
+        provider = SelectelProvider(
+            self._version,
+            self._openstack_token,
+            prefetch=[self._zone_name, 'other.tests.'],
+        )
+
+        provider.populate(Zone('other.tests.', []))
+        provider.populate(Zone(self._zone_name, []))
+        # broken.tests. is not configured and never listed
+        self.assertEqual([1, 1], [listing.call_count for listing in listings])
+
+        # applying a prefetched zone drops its listing
+        provider.prefetch([self._zone_name])
+        desired = self._desired_zone()
+        provider.apply(Plan(None, desired, [], True))
+        provider.populate(Zone(self._zone_name, []))
+        self.assertEqual([3, 1], [listing.call_count for listing in listings])
+
+    @requests_mock.Mocker()
+    def test_apply_drops_cached_rrsets(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset',
+            json=dict(result=[], limit=0, next_offset=0),
+        )
+        fake_http.post(f'{DNSClient.API_URL}/zones/{self._zone_id}/rrset')
+        provider = SelectelProvider(self._version, self._openstack_token)
+
+        plan = provider.plan(self._desired_zone())
+        self.assertIn(self._zone_name, provider._zone_rrsets)
+        provider.apply(plan)
+        self.assertNotIn(self._zone_name, provider._zone_rrsets)
+
+    def _mock_paged_rrsets(self, fake_http, page_size):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(
+                result=self.selectel_zones,
+                limit=len(self.selectel_zones),
+                next_offset=0,
+            ),
+        )
+        for offset in range(0, len(self.rrsets), page_size):
+            next_offset = offset + page_size
+            fake_http.get(
+                f'{DNSClient.API_URL}/zones/{self._zone_id}/'
+                f'rrset?limit={DNSClient._PAGINATION_LIMIT}&offset={offset}',
+                json=dict(
+                    result=self.rrsets[offset:next_offset],
+                    limit=page_size,
+                    next_offset=(
+                        next_offset if next_offset < len(self.rrsets) else 0
+                    ),
+                ),
+            )
+
+    @requests_mock.Mocker()
+    def test_populate_pipelined(self, fake_http):
+        self._mock_paged_rrsets(fake_http, 3)
+        provider = SelectelProvider(
+            self._version, self._openstack_token, pipeline_depth=1
+        )
+
+        zone = Zone(self._zone_name, [])
+        provider.populate(zone)
+
+        self.assertEqual(self.expected_records, zone.records)
+        self.assertEqual(self.rrsets, provider._zone_rrsets[self._zone_name])
+
+    @requests_mock.Mocker()
+    def test_populate_pipelined_error(self, fake_http):
+        self._mock_paged_rrsets(fake_http, 3)
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self._zone_id}/'
+            f'rrset?limit={DNSClient._PAGINATION_LIMIT}&offset=6',
+            status_code=500,
+        )
+        provider = SelectelProvider(
+            self._version, self._openstack_token, pipeline_depth=2
+        )
+
+        with self.assertRaises(ApiException):
+            provider.populate(Zone(self._zone_name, []))
+        self.assertNotIn(self._zone_name, provider._zone_rrsets)
+
+    def _streamed_changes(self, provider, desired):
+        return sorted(
+            (
+                (
+                    change.__class__.__name__,
+                    change.record.name,
+                    change.record._type,
+                )
+                for change in provider.iter_changes(desired)
+            ),
+            key=str,
+        )
+
+    @requests_mock.Mocker()
+    def test_iter_changes(self, fake_http):
+        self.rrsets.append(
+            dict(
+                id='soa',
+                name=self._zone_name,
+                type='SOA',
+                ttl=self._ttl,
+                records=[dict(content='a. b. 1 2 3 4 5')],
+            )
+        )
+        self.rrsets.sort(key=lambda rrset: rrset['name'], reverse=True)
+        self._mock_paged_rrsets(fake_http, 3)
+        desired = Zone(self._zone_name, [])
+        for record in self.expected_records:
+            if record.name == 'sub':
+                continue
+            if record.name == 'txt':
+                record = record.copy()
+                record.values = ['changed']
+            desired.add_record(record)
+        desired.add_record(
+            Record.new(desired, 'new', dict(type='A', ttl=300, value='1.2.3.4'))
+        )
+        desired.add_record(
+            Record.new(
+                desired, '', dict(type='NS', ttl=300, value='ns.unit.tests.')
+            )
+        )
+
+        for pipeline_depth in (0, 2):
+            provider = SelectelProvider(
+                self._version,
+                self._openstack_token,
+                pipeline_depth=pipeline_depth,
+            )
+            self.assertEqual(
+                [
+                    ('Create', 'new', 'A'),
+                    ('Delete', 'sub', 'A'),
+                    ('Update', 'txt', 'TXT'),
+                ],
+                self._streamed_changes(provider, desired),
+            )
+
+    @requests_mock.Mocker()
+    def test_iter_changes_new_zone(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones',
+            json=dict(result=[], limit=0, next_offset=0),
+        )
+        provider = SelectelProvider(self._version, self._openstack_token)
+        desired = Zone(self._zone_name, [])
+        for record in self.expected_records:
+            desired.add_record(record)
+
+        self.assertEqual(
+            sorted(
+                (('Create', r.name, r._type) for r in self.expected_records),
+                key=str,
+            ),
+            self._streamed_changes(provider, desired),
+        )
+
+    @requests_mock.Mocker()
+    def test_iter_changes_unsorted(self, fake_http):
+        self._mock_paged_rrsets(fake_http, 3)
+        provider = SelectelProvider(self._version, self._openstack_token)
+
+        with self.assertRaises(SelectelException):
+            list(provider.iter_changes(Zone(self._zone_name, [])))
+
     @requests_mock.Mocker()
     def test_list_zones(self, fake_http):
         fake_http.get(
@@ -665,3 +1348,79 @@ class TestSelectelProvider(TestCase):
         zones = provider.list_zones()
 
         self.assertListEqual(zones, self._zone_name.split())
+
+    def test_sharding(self):
+        zone_names = [f'zone-{i}.tests.' for i in range(6)]
+        transport = MemoryTransport({name: [] for name in zone_names})
+        providers = [
+            SelectelProvider(
+                'test',
+                'token',
+                transport=transport,
+                shard_index=i,
+                shard_count=3,
+            )
+            for i in range(3)
+        ]
+        listed = [provider.list_zones() for provider in providers]
+        self.assertEqual(['zone-3.tests.'], listed[0])
+        self.assertEqual(sorted(zone_names), sorted(sum(listed, [])))
+
+        provider = providers[0]
+        desired = Zone('zone-3.tests.', [])
+        desired.add_record(
+            Record.new(desired, 'www', dict(type='A', ttl=300, value='1.2.3.4'))
+        )
+        plan = provider.plan(desired)
+        self.assertEqual(1, provider.apply(plan))
+        self.assertEqual(1, provider.metrics.get('shard.zones'))
+        self.assertGreater(provider.metrics.get('shard.plan.seconds'), 0)
+        self.assertGreater(provider.metrics.get('shard.apply.seconds'), 0)
+
+        # zones of other shards are neither planned, populated nor applied
+        other = Zone('zone-0.tests.', [])
+        other.add_record(
+            Record.new(other, 'www', dict(type='A', ttl=300, value='1.2.3.4'))
+        )
+        self.assertIsNone(provider.plan(other))
+        self.assertEqual(1, provider.metrics.get('shard.skipped_zones'))
+        with self.assertRaises(SelectelException) as ctx:
+            provider.populate(Zone('zone-0.tests.', []))
+        self.assertEqual(
+            'Zone zone-0.tests. belongs to shard 1, not 0', str(ctx.exception)
+        )
+        with self.assertRaises(SelectelException):
+            provider.apply(
+                Plan(None, other, [Create(other.records.pop())], True)
+            )
+
+        with self.assertRaises(SelectelException) as ctx:
+            SelectelProvider('test', 'token', shard_index=3, shard_count=3)
+        self.assertEqual(
+            'shard_index 3 out of range for shard_count 3', str(ctx.exception)
+        )
+
+    def test_rate_limit(self):
+        transport = MemoryTransport({self._zone_name: []})
+        provider = SelectelProvider(
+            'test', 'token', transport=transport, rate_limit=10
+        )
+        self.assertIsInstance(provider._client._rate_limiter, RateLimiter)
+        self.assertNotIsInstance(
+            provider._client._rate_limiter, SharedRateLimiter
+        )
+
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'selectel.bucket')
+            provider = SelectelProvider(
+                'test',
+                'token',
+                transport=transport,
+                rate_limit=10,
+                rate_limit_file=path,
+            )
+            self.assertIsInstance(
+                provider._client._rate_limiter, SharedRateLimiter
+            )
+            self.assertEqual(['unit.tests.'], provider.list_zones())
+            self.assertTrue(exists(path))
@@ -0,0 +1,190 @@
+from json import dumps, loads
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from requests import Request, Response
+from requests.adapters import HTTPAdapter
+
+from octodns.zone import Zone
+
+from octodns_selectel.v2.cassette import RecordingAdapter, ReplayAdapter
+from octodns_selectel.v2.dns_client import DNSClient
+from octodns_selectel.v2.exceptions import SelectelException
+from octodns_selectel.v2.provider import SelectelProvider
+
+
+class TestSelectelCassette(TestCase):
+    zone_id = 'zone-id'
+    zones = dict(
+        result=[dict(id=zone_id, name='unit.tests.')], limit=1, next_offset=0
+    )
+    rrsets = dict(
+        result=[
+            dict(
+                id='a-id',
+                name='www.unit.tests.',
+                type='A',
+                ttl=300,
+                records=[dict(content='1.2.3.4')],
+            )
+        ],
+        limit=1,
+        next_offset=0,
+    )
+
+    def _interaction(self, method, path, response, params=[], body=None):
+        return dict(
+            method=method,
+            path=f'/domains/v2{path}',
+            params=params,
+            body=body,
+            status=200,
+            latency=0.0,
+            response=dumps(response),
+        )
+
+    def _write(self, path, interactions):
+        with open(path, 'w') as fh:
+            for interaction in interactions:
+                fh.write(f'{dumps(interaction)}\n')
+
+    def _prepared(self, method, path, params=None, json=None):
+        return Request(
+            method, f'{DNSClient.API_URL}{path}', params=params, json=json
+        ).prepare()
+
+    def test_recording(self):
+        response = Response()
+        response.status_code = 201
+        response._content = b'{"id": "created"}'
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'cassette.jsonl')
+            adapter = RecordingAdapter(path)
+            with patch.object(HTTPAdapter, 'send', return_value=response):
+                for _ in range(2):
+                    self.assertIs(
+                        response,
+                        adapter.send(
+                            self._prepared(
+                                'POST',
+                                '/zones',
+                                params=dict(limit=10),
+                                json=dict(name='unit.tests.'),
+                            )
+                        ),
+                    )
+                adapter.send(self._prepared('GET', '/zones'))
+            with open(path) as fh:
+                lines = [loads(line) for line in fh]
+
+        self.assertEqual(3, len(lines))
+        self.assertLess(0, lines[0].pop('latency'))
+        self.assertEqual(
+            dict(
+                method='POST',
+                path='/domains/v2/zones',
+                params=[['limit', '10']],
+                body=dict(name='unit.tests.'),
+                status=201,
+                response='{"id": "created"}',
+            ),
+            lines[0],
+        )
+        self.assertIsNone(lines[2]['body'])
+
+    def test_replay(self):
+        sleeps = []
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'cassette.jsonl')
+            first = self._interaction('GET', '/zones', dict(n=1))
+            first['latency'] = 0.5
+            self._write(
+                path,
+                [
+                    first,
+                    self._interaction('GET', '/zones', dict(n=2)),
+                    self._interaction(
+                        'POST',
+                        '/zones',
+                        dict(n=3),
+                        params=[['b', '2'], ['a', '1']],
+                        body=dict(name='unit.tests.'),
+                    ),
+                ],
+            )
+            adapter = ReplayAdapter(
+                path, latency_scale=0.5, sleep=sleeps.append
+            )
+
+        # identical requests are answered in the recorded order
+        request = self._prepared('GET', '/zones')
+        self.assertEqual(dict(n=1), adapter.send(request).json())
+        self.assertEqual(dict(n=2), adapter.send(request).json())
+        self.assertEqual([0.25], sleeps)
+        response = adapter.send(
+            self._prepared(
+                'POST',
+                '/zones',
+                params=dict(a=1, b=2),
+                json=dict(name='unit.tests.'),
+            )
+        )
+        self.assertEqual(
+            (200, dict(n=3)), (response.status_code, response.json())
+        )
+        self.assertEqual(f'{DNSClient.API_URL}/zones?a=1&b=2', response.url)
+
+        with self.assertRaises(SelectelException) as ctx:
+            adapter.send(request)
+        self.assertEqual(
+            f'No recorded response for GET {DNSClient.API_URL}/zones',
+            str(ctx.exception),
+        )
+        adapter.close()
+
+    def test_provider_replay(self):
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'cassette.jsonl')
+            params = [
+                ['limit', '1000'],
+                ['offset', '0'],
+                ['sort_by', 'name.descend'],
+            ]
+            self._write(
+                path,
+                [
+                    self._interaction('GET', '/zones', self.zones, params),
+                    self._interaction(
+                        'GET',
+                        f'/zones/{self.zone_id}/rrset',
+                        self.rrsets,
+                        params,
+                    ),
+                ],
+            )
+            provider = SelectelProvider(
+                'test', 'token', replay_traffic=path, replay_latency_scale=0
+            )
+
+        zone = Zone('unit.tests.', [])
+        provider.populate(zone)
+        self.assertEqual(['www'], [record.name for record in zone.records])
+
+    def test_provider_recording(self):
+        response = Response()
+        response.status_code = 200
+        response._content = dumps(self.zones).encode()
+        with TemporaryDirectory() as tmpdir:
+            path = join(tmpdir, 'cassette.jsonl')
+            with patch.object(HTTPAdapter, 'send', return_value=response):
+                provider = SelectelProvider(
+                    'test', 'token', record_traffic=path
+                )
+            with open(path) as fh:
+                self.assertEqual(
+                    '/domains/v2/zones', loads(fh.readline())['path']
+                )
+
+        self.assertEqual(['unit.tests.'], provider.list_zones())
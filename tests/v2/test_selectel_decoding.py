@@ -0,0 +1,32 @@
+import json
+from importlib import reload
+from unittest import TestCase
+from unittest.mock import patch
+
+from octodns_selectel.v2 import decoding
+
+
+class TestSelectelDecoding(TestCase):
+    def test_loads(self):
+        self.assertEqual(dict(result=[]), decoding.loads(b'{"result": []}'))
+        with self.assertRaises(ValueError):
+            decoding.loads(b'')
+
+    def test_loads_without_orjson(self):
+        try:
+            with patch.dict('sys.modules', orjson=None):
+                reload(decoding)
+            self.assertIs(json.loads, decoding.loads)
+        finally:
+            reload(decoding)
+
+    def test_filter_rrsets(self):
+        rrsets = [
+            dict(name='unit.tests.', type='SOA'),
+            dict(name='www.unit.tests.', type='A'),
+            dict(name='unit.tests.', type='LOC'),
+        ]
+        self.assertEqual(
+            [dict(name='www.unit.tests.', type='A')],
+            decoding.filter_rrsets(rrsets, {'A', 'TXT'}),
+        )
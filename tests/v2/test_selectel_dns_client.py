@@ -1,9 +1,12 @@
 from unittest import TestCase
+from unittest.mock import Mock
 
 import requests_mock
 
+from octodns_selectel.metrics import Metrics
 from octodns_selectel.v2.dns_client import DNSClient
 from octodns_selectel.v2.exceptions import ApiException
+from octodns_selectel.v2.transport import MemoryTransport
 
 
 class TestSelectelDNSClient(TestCase):
@@ -242,6 +245,84 @@ class TestSelectelDNSClient(TestCase):
             self._response_list_rrset_without_offset["result"], rrsets
         )
 
+    @requests_mock.Mocker()
+    def test_list_rrsets_filtered(self, fake_http):
+        listing = fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset',
+            json=self._response_list_rrset_without_offset,
+        )
+        self.dns_client.list_rrsets(
+            self.zone_id, rrset_types='A,TXT', name=f'www.{self.zone_name}'
+        )
+        self.assertEqual(
+            dict(rrset_types=['a,txt'], name=[f'www.{self.zone_name}']),
+            {
+                key: value
+                for key, value in listing.last_request.qs.items()
+                if key in ('rrset_types', 'name', 'search')
+            },
+        )
+
+        self.dns_client.list_rrsets(self.zone_id, search='www')
+        self.assertEqual(['www'], listing.last_request.qs['search'])
+        self.assertNotIn('name', listing.last_request.qs)
+
+    @requests_mock.Mocker()
+    def test_list_rrsets_keep_types(self, fake_http):
+        fake_http.get(
+            f'{DNSClient.API_URL}/zones/{self.zone_id}/rrset',
+            json=self._response_list_rrset_without_offset,
+        )
+        rrsets = self.dns_client.list_rrsets(self.zone_id, keep_types={'NS'})
+        self.assertEqual(['NS'], [rrset['type'] for rrset in rrsets])
+
+    def test_adaptive_page_size(self):
+        transport = MemoryTransport(
+            {
+                self.zone_name: [
+                    dict(name=f'{i}.{self.zone_name}', type='A', records=[])
+                    for i in range(10)
+                ]
+            }
+        )
+        transport.request = Mock(wraps=transport.request)
+        metrics = Metrics()
+        dns_client = DNSClient(
+            self.library_version,
+            self.openstack_token,
+            transport=transport,
+            page_size=2,
+            adaptive_page_size=True,
+            metrics=metrics,
+        )
+
+        self.assertEqual(10, len(dns_client.list_rrsets('zone-1')))
+        self.assertEqual(
+            [(2, 0), (4, 2), (8, 6)],
+            [
+                (
+                    call.kwargs['params']['limit'],
+                    call.kwargs['params']['offset'],
+                )
+                for call in transport.request.call_args_list
+            ],
+        )
+        self.assertEqual(8, metrics.get('rrsets.page_size'))
+        self.assertEqual(2, metrics.get('zones.page_size'))
+
+    def test_rate_limiter(self):
+        rate_limiter = Mock()
+        dns_client = DNSClient(
+            self.library_version,
+            self.openstack_token,
+            transport=MemoryTransport({self.zone_name: []}),
+            rate_limiter=rate_limiter,
+        )
+
+        dns_client.list_zones()
+        dns_client.list_rrsets('zone-1')
+        self.assertEqual(2, rate_limiter.acquire.call_count)
+
     @requests_mock.Mocker()
     def test_create_rrset_success(self, fake_http):
         response_created_rrset = dict(
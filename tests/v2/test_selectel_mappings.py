@@ -17,6 +17,8 @@ from octodns.zone import Zone
 
 from octodns_selectel.v2.exceptions import SelectelException
 from octodns_selectel.v2.mappings import (
+    canonical_record,
+    record_fingerprint,
     to_octodns_record_data,
     to_selectel_rrset,
 )
@@ -711,6 +713,9 @@ class TestSelectelMappings(TestCase):
                 'DNS Record with type: INCORRECT not supported',
             )
 
+        with self.assertRaises(SelectelException):
+            canonical_record(invalid_type_record)
+
         with self.assertRaises(SelectelException) as selectel_exception:
             _ = to_selectel_rrset(invalid_type_record)
             print(invalid_type_record._type)
@@ -718,3 +723,69 @@ class TestSelectelMappings(TestCase):
                 selectel_exception.exception,
                 'DNS Record with type: INCORRECT not supported',
             )
+
+    def test_record_fingerprint(self):
+        record = ARecord(
+            self.zone,
+            "a",
+            dict(type="A", ttl=30, values=["5.6.7.8", "1.2.3.4"]),
+        )
+        same = ARecord(
+            self.zone,
+            "a",
+            dict(type="A", ttl=60, values=["1.2.3.4", "5.6.7.8"]),
+        )
+        self.assertEqual(
+            record_fingerprint(record, 60), record_fingerprint(same, 60)
+        )
+        self.assertNotEqual(
+            record_fingerprint(record), record_fingerprint(same)
+        )
+        self.assertNotEqual(
+            record_fingerprint(same),
+            record_fingerprint(
+                AaaaRecord(
+                    self.zone, "a", dict(type="AAAA", ttl=60, value="::1")
+                )
+            ),
+        )
+
+    def test_record_fingerprint_single_value(self):
+        cname = CnameRecord(
+            self.zone, "www", dict(type="CNAME", ttl=self.ttl, value="a.ru.")
+        )
+        self.assertEqual(
+            ("CNAME", self.ttl, ("a.ru.",)), canonical_record(cname)
+        )
+
+    def test_record_fingerprint_sshfp_case_insensitive(self):
+        value = dict(algorithm=1, fingerprint_type=1, fingerprint="abcdef")
+        lower = SshfpRecord(
+            self.zone, "sshfp", dict(type="SSHFP", ttl=self.ttl, value=value)
+        )
+        upper = SshfpRecord(
+            self.zone,
+            "sshfp",
+            dict(
+                type="SSHFP",
+                ttl=self.ttl,
+                value=dict(value, fingerprint="ABCDEF"),
+            ),
+        )
+        self.assertEqual(record_fingerprint(lower), record_fingerprint(upper))
+        self.assertEqual("ABCDEF", upper.values[0].fingerprint)
+
+    def test_record_fingerprint_txt_escaping(self):
+        escaped = TxtRecord(
+            self.zone,
+            "txt",
+            dict(type="TXT", ttl=self.ttl, value="v=DKIM1\\; k=rsa"),
+        )
+        unescaped = TxtRecord(
+            self.zone,
+            "txt",
+            dict(type="TXT", ttl=self.ttl, value="v=DKIM1; k=rsa"),
+        )
+        self.assertEqual(
+            record_fingerprint(escaped), record_fingerprint(unescaped)
+        )
@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from octodns_selectel.v2.exceptions import SelectelException
+from octodns_selectel.v2.merge import merge_join
+
+
+class TestSelectelMerge(TestCase):
+    def test_merge_join(self):
+        existing = [('d', 1), ('c', 1), ('c', 2), ('a', 1)]
+        desired = [('e', 3), ('c', 3), ('b', 3), ('a', 3), ('a', 4)]
+
+        self.assertEqual(
+            [
+                ('e', [], [('e', 3)]),
+                ('d', [('d', 1)], []),
+                ('c', [('c', 1), ('c', 2)], [('c', 3)]),
+                ('b', [], [('b', 3)]),
+                ('a', [('a', 1)], [('a', 3), ('a', 4)]),
+            ],
+            list(merge_join(existing, desired, key=lambda item: item[0])),
+        )
+        self.assertEqual([], list(merge_join([], [], key=str)))
+        self.assertEqual(
+            [('b', ['b'], []), ('a', ['a'], [])],
+            list(merge_join(iter('ba'), [], key=str)),
+        )
+
+    def test_merge_join_unsorted(self):
+        with self.assertRaises(SelectelException) as ctx:
+            list(merge_join(['a', 'b'], [], key=str))
+        self.assertEqual(
+            'Items are not sorted descending: b after a', str(ctx.exception)
+        )
@@ -0,0 +1,68 @@
+from threading import Event
+from unittest import TestCase
+
+from octodns_selectel.v2.pipeline import iter_pipelined
+
+
+class TestSelectelPipeline(TestCase):
+    def test_iter_pipelined(self):
+        self.assertEqual([1, 2, 3], list(iter_pipelined(iter([1, 2, 3]), 1)))
+        self.assertEqual([], list(iter_pipelined(iter([]), 2)))
+
+    def test_iter_pipelined_error(self):
+        def pages():
+            yield 1
+            raise ValueError('boom')
+
+        pipelined = iter_pipelined(pages(), 2)
+        self.assertEqual(1, next(pipelined))
+        with self.assertRaises(ValueError):
+            next(pipelined)
+
+    def test_iter_pipelined_stopped_early(self):
+        fetching_third, release, closed = Event(), Event(), Event()
+        fetched = []
+
+        def pages():
+            try:
+                fetched.append(1)
+                yield 1
+                fetched.append(2)
+                yield 2
+                fetching_third.set()
+                release.wait()
+                fetched.append(3)
+                yield 3
+                fetched.append(4)
+                yield 4
+            finally:
+                closed.set()
+
+        pipelined = iter_pipelined(pages(), 1)
+        self.assertEqual(1, next(pipelined))
+        # page 2 waits in the full queue while page 3 is being fetched
+        self.assertTrue(fetching_third.wait(5))
+        pipelined.close()
+        release.set()
+
+        self.assertTrue(closed.wait(5))
+        self.assertEqual([1, 2, 3], fetched)
+
+    def test_iter_pipelined_stopped_before_end(self):
+        fetching_last, release, closed = Event(), Event(), Event()
+
+        def pages():
+            try:
+                yield 1
+                fetching_last.set()
+                release.wait()
+            finally:
+                closed.set()
+
+        pipelined = iter_pipelined(pages(), 1)
+        self.assertEqual(1, next(pipelined))
+        self.assertTrue(fetching_last.wait(5))
+        pipelined.close()
+        release.set()
+
+        self.assertTrue(closed.wait(5))
@@ -0,0 +1,24 @@
+from unittest import TestCase
+
+from octodns_selectel.v2.sharding import shard_of
+
+
+class TestSelectelSharding(TestCase):
+    zone_names = [f'zone-{i}.tests.' for i in range(1000)]
+
+    def test_shard_of(self):
+        owners = {name: shard_of(name, 4) for name in self.zone_names}
+        self.assertEqual(owners, {n: shard_of(n, 4) for n in self.zone_names})
+        self.assertEqual({0}, {shard_of(name, 1) for name in self.zone_names})
+
+        counts = [list(owners.values()).count(shard) for shard in range(4)]
+        for count in counts:
+            self.assertGreater(count, 200)
+            self.assertLess(count, 300)
+
+        # only the zones of a removed shard move, each to a remaining shard
+        for name, owner in owners.items():
+            if owner != 3:
+                self.assertEqual(owner, shard_of(name, 3))
+            else:
+                self.assertIn(shard_of(name, 3), (0, 1, 2))
@@ -0,0 +1,50 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import Mock
+
+from octodns_selectel.v2.single_flight import SingleFlight
+
+
+class TestSelectelSingleFlight(TestCase):
+    def test_do_runs_function(self):
+        flight = SingleFlight()
+        fn = Mock(return_value=42)
+
+        self.assertEqual(42, flight.do('key', fn, 1, b=2))
+        self.assertEqual(42, flight.do('key', fn, 1, b=2))
+        fn.assert_called_with(1, b=2)
+        self.assertEqual(2, fn.call_count)
+        self.assertEqual({}, flight._calls)
+
+    def test_do_raises_exception(self):
+        flight = SingleFlight()
+        fn = Mock(side_effect=ValueError('boom'))
+
+        with self.assertRaises(ValueError):
+            flight.do('key', fn)
+        self.assertEqual({}, flight._calls)
+
+    def test_do_shares_in_flight_call(self):
+        flight = SingleFlight()
+        in_flight = Future()
+        flight._calls['key'] = in_flight
+        fn = Mock()
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            waiting = [executor.submit(flight.do, 'key', fn) for _ in range(3)]
+            in_flight.set_result('shared')
+            results = [future.result() for future in waiting]
+
+        self.assertEqual(['shared'] * 3, results)
+        fn.assert_not_called()
+
+    def test_do_shares_in_flight_exception(self):
+        flight = SingleFlight()
+        in_flight = Future()
+        flight._calls['key'] = in_flight
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            waiting = executor.submit(flight.do, 'key', Mock())
+            in_flight.set_exception(ValueError('boom'))
+            with self.assertRaises(ValueError):
+                waiting.result()
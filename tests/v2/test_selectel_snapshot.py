@@ -0,0 +1,113 @@
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from octodns.record import Record
+from octodns.zone import Zone
+
+from octodns_selectel.v2.snapshot import ZoneSnapshots, soa_serial, zone_digest
+
+
+class TestSelectelSnapshot(TestCase):
+    zone_name = "test-octodns.ru."
+    supports = {"A", "TXT"}
+    soa_rrset = dict(
+        name=zone_name,
+        ttl=3600,
+        type="SOA",
+        records=[
+            dict(
+                content="a.ns.selectel.ru. support.selectel.ru. 2023122202 "
+                "10800 3600 604800 60"
+            )
+        ],
+    )
+    a_rrset = dict(
+        id="a-rrset-id",
+        name=f"a.{zone_name}",
+        ttl=3600,
+        type="A",
+        records=[dict(content="1.2.3.4")],
+    )
+
+    def _zone(self, *records):
+        zone = Zone(self.zone_name, [])
+        for name, data in records:
+            zone.add_record(Record.new(zone, name, data))
+        return zone
+
+    def test_zone_digest(self):
+        a = ("a", dict(type="A", ttl=3600, value="1.2.3.4"))
+        b = ("b", dict(type="A", ttl=30, value="1.2.3.4"))
+        caa = ("", dict(type="CAA", ttl=60, value=dict(tag="issue", value="x")))
+        digest = zone_digest(self._zone(a, b), self.supports, 60)
+
+        self.assertEqual(
+            digest, zone_digest(self._zone(b, a), self.supports, 60)
+        )
+        self.assertEqual(
+            digest, zone_digest(self._zone(a, b, caa), self.supports, 60)
+        )
+        self.assertNotEqual(
+            digest, zone_digest(self._zone(a, b), self.supports)
+        )
+        self.assertNotEqual(
+            digest, zone_digest(self._zone(a), self.supports, 60)
+        )
+
+    def test_soa_serial(self):
+        self.assertEqual(
+            "2023122202", soa_serial([self.a_rrset, self.soa_rrset])
+        )
+        self.assertIsNone(soa_serial([self.a_rrset]))
+
+    def test_snapshots_in_memory(self):
+        snapshots = ZoneSnapshots()
+        snapshots.save(self.zone_name, "digest", "1", [self.a_rrset])
+
+        self.assertEqual(
+            [self.a_rrset], snapshots.get(self.zone_name, "digest", "1")
+        )
+        self.assertIsNone(snapshots.get(self.zone_name, "digest", "2"))
+        self.assertIsNone(snapshots.get(self.zone_name, "other", "1"))
+        self.assertIsNone(snapshots.get(self.zone_name, "digest", None))
+        self.assertIsNone(snapshots.get("other.ru.", "digest", "1"))
+
+        snapshots.discard(self.zone_name)
+        snapshots.discard(self.zone_name)
+        self.assertIsNone(snapshots.get(self.zone_name, "digest", "1"))
+
+    def test_snapshots_persisted(self):
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, "snapshots.json")
+            with patch("octodns_selectel.v2.snapshot.register") as register:
+                snapshots = ZoneSnapshots(path)
+            register.assert_called_once_with(snapshots.flush)
+            snapshots.save(self.zone_name, "digest", "1", [self.a_rrset])
+            snapshots.save(self.zone_name, "digest", "1", [self.a_rrset])
+            self.assertFalse(exists(path))
+            snapshots.flush()
+
+            reloaded = ZoneSnapshots(path)
+            self.assertEqual(
+                [self.a_rrset], reloaded.get(self.zone_name, "digest", "1")
+            )
+
+            reloaded.discard(self.zone_name)
+            reloaded.flush()
+            self.assertIsNone(
+                ZoneSnapshots(path).get(self.zone_name, "digest", "1")
+            )
+
+    def test_snapshots_flushed_in_batches(self):
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, "snapshots.json")
+            snapshots = ZoneSnapshots(path, flush_every=2)
+            snapshots.save("a.ru.", "digest", "1", [])
+            self.assertFalse(exists(path))
+            snapshots.discard("a.ru.")
+            self.assertTrue(exists(path))
+            self.assertEqual(0, snapshots._pending)
+            # nothing pending, nothing written
+            snapshots.flush()
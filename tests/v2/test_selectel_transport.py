@@ -0,0 +1,99 @@
+from unittest import TestCase
+
+from octodns.record import Record
+from octodns.zone import Zone
+
+from octodns_selectel.v2.dns_client import DNSClient
+from octodns_selectel.v2.provider import SelectelProvider
+from octodns_selectel.v2.transport import MemoryTransport
+
+
+class TestSelectelTransport(TestCase):
+    zone_name = 'unit.tests.'
+    url = f'{DNSClient.API_URL}/zones'
+
+    def _rrset(self, name, _type='A', content='1.2.3.4'):
+        return dict(
+            name=f'{name}.{self.zone_name}' if name else self.zone_name,
+            type=_type,
+            ttl=300,
+            records=[dict(content=content)],
+        )
+
+    def _transport(self):
+        return MemoryTransport(
+            {
+                self.zone_name: [
+                    self._rrset('', 'SOA', 'a. b. 1 2 3 4 5'),
+                    self._rrset('www'),
+                    self._rrset('old'),
+                    self._rrset('txt', 'TXT', '"v=spf1 -all"'),
+                ]
+            }
+        )
+
+    def _names(self, body):
+        return [rrset['name'] for rrset in body['result']]
+
+    def test_memory_transport_listing(self):
+        transport = self._transport()
+        url = f'{self.url}/zone-1/rrset'
+
+        status, body = transport.request('GET', url, params=dict(limit=2))
+        self.assertEqual(200, status)
+        self.assertEqual(['www.unit.tests.', 'unit.tests.'], self._names(body))
+        self.assertEqual(2, body['next_offset'])
+        status, body = transport.request(
+            'GET', url, params=dict(limit=2, offset=2)
+        )
+        self.assertEqual(
+            ['txt.unit.tests.', 'old.unit.tests.'], self._names(body)
+        )
+        self.assertEqual(0, body['next_offset'])
+
+        for params, names in (
+            (dict(rrset_types='SOA,TXT'), ['unit.tests.', 'txt.unit.tests.']),
+            (dict(name='old.unit.tests.'), ['old.unit.tests.']),
+            (dict(search='w'), ['www.unit.tests.']),
+        ):
+            status, body = transport.request('GET', url, params=params)
+            self.assertEqual(names, self._names(body))
+
+        self.assertEqual(
+            (404, dict(error='zone not found')),
+            transport.request('GET', f'{self.url}/missing/rrset'),
+        )
+        self.assertEqual(
+            (404, dict(error='rrset not found')),
+            transport.request('DELETE', f'{url}/missing'),
+        )
+
+    def test_provider_on_memory_transport(self):
+        transport = self._transport()
+        provider = SelectelProvider('test', 'token', transport=transport)
+
+        desired = Zone(self.zone_name, [])
+        desired.add_record(
+            Record.new(desired, 'www', dict(type='A', ttl=600, value='1.2.3.4'))
+        )
+        desired.add_record(
+            Record.new(
+                desired, 'txt', dict(type='TXT', ttl=300, value='v=spf1 -all')
+            )
+        )
+        desired.add_record(
+            Record.new(desired, 'new', dict(type='A', ttl=300, value='4.3.2.1'))
+        )
+        self.assertEqual(3, provider.apply(provider.plan(desired)))
+        self.assertIsNone(provider.plan(desired))
+
+        other = Zone('other.tests.', [])
+        other.add_record(
+            Record.new(other, 'www', dict(type='A', ttl=300, value='1.2.3.4'))
+        )
+        self.assertEqual(1, provider.apply(provider.plan(other)))
+        # zones are listed by name descending, like the API does
+        self.assertEqual(
+            ['unit.tests.', 'other.tests.'],
+            SelectelProvider('test', 'token', transport=transport).list_zones(),
+        )
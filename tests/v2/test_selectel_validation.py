@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+from octodns.record import Record
+from octodns.zone import Zone
+
+from octodns_selectel.v2.validation import (
+    SelectelValidationFailed,
+    cname_conflicts,
+    validate_rrsets,
+)
+
+
+class TestSelectelValidation(TestCase):
+    def _rrset(self, _type, *contents, ttl=300):
+        return dict(
+            name='www.unit.tests.',
+            type=_type,
+            ttl=ttl,
+            records=[dict(content=content) for content in contents],
+        )
+
+    def test_validate_rrsets_valid(self):
+        self.assertEqual(
+            [],
+            validate_rrsets(
+                [
+                    self._rrset('A', '1.2.3.4', ttl=60),
+                    self._rrset('CAA', '0 issue "ca.unit.tests"'),
+                    self._rrset('MX', '10 mx.unit.tests.'),
+                    self._rrset('SRV', '10 20 65535 foo.unit.tests.'),
+                    self._rrset('SSHFP', '1 1 123456789ABCDEF0'),
+                    self._rrset('TXT', '"v=spf1 -all"'),
+                ],
+                60,
+            ),
+        )
+
+    def test_validate_rrsets_problems(self):
+        self.assertEqual(
+            [
+                'www.unit.tests. A: ttl 30 below 60',
+                'www.unit.tests. A: no records',
+                'www.unit.tests. CAA: malformed content "0 issue ca"',
+                'www.unit.tests. CAA: CAA flags out of range in '
+                '"256 issue "ca""',
+                'www.unit.tests. MX: malformed content "mx.unit.tests."',
+                'www.unit.tests. SRV: malformed content "10 20 foo."',
+                'www.unit.tests. SRV: SRV field out of range in '
+                '"10 20 65536 foo."',
+                'www.unit.tests. SSHFP: malformed content "1 1 xyz"',
+            ],
+            validate_rrsets(
+                [
+                    self._rrset('A', ttl=30),
+                    self._rrset('CAA', '0 issue ca', '256 issue "ca"'),
+                    self._rrset('MX', 'mx.unit.tests.'),
+                    self._rrset('SRV', '10 20 foo.', '10 20 65536 foo.'),
+                    self._rrset('SSHFP', '1 1 xyz'),
+                ],
+                60,
+            ),
+        )
+
+    def test_cname_conflicts(self):
+        zone = Zone('unit.tests.', [])
+        records = [
+            Record.new(
+                zone, 'www', dict(type='CNAME', ttl=60, value='a.tests.')
+            ),
+            Record.new(zone, 'www', dict(type='A', ttl=60, value='1.2.3.4')),
+            Record.new(zone, 'www', dict(type='TXT', ttl=60, value='txt')),
+            Record.new(
+                zone, 'ok', dict(type='CNAME', ttl=60, value='a.tests.')
+            ),
+            Record.new(zone, 'a', dict(type='A', ttl=60, value='1.2.3.4')),
+        ]
+        self.assertEqual(
+            ['www.unit.tests. CNAME: other data at the same name (A, TXT)'],
+            cname_conflicts(records),
+        )
+
+    def test_validation_failed(self):
+        failed = SelectelValidationFailed('unit.tests.', ['first', 'second'])
+        self.assertEqual(['first', 'second'], failed.problems)
+        self.assertEqual(
+            '2 invalid rrsets in unit.tests.:\n  first\n  second', str(failed)
+        )